@@ -0,0 +1,56 @@
+import functools
+import threading
+
+
+class AckTracker:
+    """
+    Defers RabbitMQ acks until a job has left the pipeline. done() is called
+    from worker threads, so the ack is scheduled on the connection's I/O
+    thread because pika channels are not thread-safe. Each tracked delivery
+    is settled once: after a requeue, a later done() for it is ignored.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def bind(self, connection, channel):
+        self.connection = connection
+        self.channel = channel
+
+    def track(self, delivery_tag):
+        with self._lock:
+            self._pending.add(delivery_tag)
+
+    def _settle(self, delivery_tag):
+        """False if the delivery was already acked or requeued."""
+        if delivery_tag is None:
+            return False
+        with self._lock:
+            if delivery_tag not in self._pending:
+                return False
+            self._pending.discard(delivery_tag)
+            return True
+
+    def done(self, delivery_tag):
+        if not self._settle(delivery_tag):
+            return
+        self.connection.add_callback_threadsafe(
+            functools.partial(self.channel.basic_ack, delivery_tag=delivery_tag)
+        )
+
+    def requeue(self, delivery_tag):
+        """Hands the delivery back to RabbitMQ instead of acking it."""
+        if not self._settle(delivery_tag):
+            return
+        self.connection.add_callback_threadsafe(
+            functools.partial(
+                self.channel.basic_nack, delivery_tag=delivery_tag, requeue=True
+            )
+        )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
@@ -0,0 +1,252 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+PENDING_STATUSES = {"validating", "in_progress", "finalizing"}
+
+
+class BatchEvaluator:
+    """
+    Drains a backlog from a pipeline stage through the OpenAI Batch API.
+    Whenever more than `threshold` jobs are queued on the stage, the oldest
+    (up to max_jobs) are taken off it and submitted as one batch, leaving
+    the newest for the real-time workers.
+
+    request_body(job) returns the chat completion request for a job, or None
+    if the job needs no request (e.g. it was answered from a cache).
+    apply_result(job, content) stores the model's reply on the job and raises
+    if it is unusable. on_submitted(jobs) runs once the batch is accepted.
+
+    Submitted batches are recorded in `workdir` so a restarted consumer picks
+    up their results instead of evaluating the jobs again. Underscore-prefixed
+    bookkeeping keys are not persisted. A batch's record is only removed once
+    all its jobs have left the pipeline, which the pipeline's on_complete
+    reports by calling finished(job).
+    """
+
+    def __init__(
+        self,
+        client,
+        pipeline,
+        stage_name,
+        request_body,
+        apply_result,
+        on_submitted=None,
+        threshold=200,
+        max_jobs=1000,
+        poll_interval=30,
+        workdir="batches",
+    ):
+        self.client = client
+        self.pipeline = pipeline
+        self.stage = pipeline.stages[stage_name]
+        self.request_body = request_body
+        self.apply_result = apply_result
+        self.on_submitted = on_submitted
+        self.threshold = threshold
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.workdir = workdir
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        # batch_id -> jobs of the batch still in the pipeline
+        self._outstanding = {}
+        self._stopped = threading.Event()
+        os.makedirs(workdir, exist_ok=True)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _manifest_path(self, batch_id):
+        return os.path.join(self.workdir, f"{batch_id}.json")
+
+    def _track(self, batch_id, jobs):
+        with self._lock:
+            self._outstanding[batch_id] = len(jobs)
+        for job in jobs:
+            job["_batch_id"] = batch_id
+
+    def finished(self, job):
+        """
+        Called for every job leaving the pipeline; removes the record of its
+        batch once the last of the batch's jobs is through.
+        """
+        batch_id = job.get("_batch_id")
+        if batch_id is None:
+            return
+        with self._lock:
+            remaining = self._outstanding.get(batch_id)
+            if remaining is None:
+                return
+            if remaining > 1:
+                self._outstanding[batch_id] = remaining - 1
+                return
+            del self._outstanding[batch_id]
+        os.remove(self._manifest_path(batch_id))
+
+    def _submit(self, jobs, bodies):
+        """Uploads the requests and creates the batch. Returns the batch ID."""
+        input_path = os.path.join(self.workdir, f"input-{time.time_ns()}.jsonl")
+        with open(input_path, "w") as f:
+            for index, body in enumerate(bodies):
+                request = {
+                    "custom_id": str(index),
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": body,
+                }
+                f.write(json.dumps(request) + "\n")
+        try:
+            with open(input_path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=COMPLETION_WINDOW,
+            )
+        finally:
+            os.remove(input_path)
+        persisted = [
+            {key: value for key, value in job.items() if not key.startswith("_")}
+            for job in jobs
+        ]
+        with open(self._manifest_path(batch.id), "w") as f:
+            json.dump({"batch_id": batch.id, "jobs": persisted}, f, default=str)
+        return batch.id
+
+    def _results(self, batch_id):
+        """
+        Polls until the batch is done and returns its replies by custom_id.
+        Returns None if the evaluator was stopped first.
+        """
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status not in PENDING_STATUSES:
+                break
+            if self._stopped.wait(self.poll_interval):
+                return None
+        if batch.status != "completed" or not batch.output_file_id:
+            logger.error(f"Batch {batch_id} ended with status {batch.status}.")
+            return {}
+        results = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                body = response["body"]
+                results[record["custom_id"]] = body["choices"][0]["message"]["content"]
+        return results
+
+    def _apply(self, jobs, results):
+        """Returns the jobs whose result was missing or unusable."""
+        failed = []
+        for index, job in enumerate(jobs):
+            content = results.get(str(index))
+            try:
+                if content is None:
+                    raise ValueError("no result in batch output")
+                self.apply_result(job, content)
+            except Exception as e:
+                logger.error(f'Batch result for job ID {job["id"]} unusable: {e}')
+                failed.append(job)
+        self._count("jobs_completed", len(jobs) - len(failed))
+        self._count("jobs_failed", len(failed))
+        return failed
+
+    def _collect(self, batch_id, jobs, started):
+        try:
+            results = self._results(batch_id)
+        except Exception as e:
+            logger.error(f"Could not collect batch {batch_id}: {e}")
+            results = {}
+        if results is None:
+            return
+        failed = self._apply(jobs, results)
+        self._track(batch_id, jobs)
+        self.stage.complete(jobs, failed, time.monotonic() - started, taken=True)
+        logger.info(
+            f"Batch {batch_id} finished: {len(jobs) - len(failed)} evaluated, "
+            f"{len(failed)} sent back to the real-time path."
+        )
+
+    def _drain(self):
+        started = time.monotonic()
+        pending, bodies, resolved, failed = [], [], [], []
+        for job in self.stage.take(self.max_jobs):
+            try:
+                body = self.request_body(job)
+            except Exception as e:
+                logger.error(f'Could not build a batch request for job ID {job["id"]}: {e}')
+                failed.append(job)
+                continue
+            if body is None:
+                resolved.append(job)
+            else:
+                pending.append(job)
+                bodies.append(body)
+        if resolved or failed:
+            self.stage.complete(resolved + failed, failed, 0.0, taken=True)
+        if not pending:
+            return
+        try:
+            batch_id = self._submit(pending, bodies)
+        except Exception as e:
+            logger.error(f"Could not submit a batch of {len(pending)} jobs: {e}")
+            self.stage.complete(pending, pending, time.monotonic() - started, taken=True)
+            return
+        self._count("batches_submitted")
+        self._count("jobs_submitted", len(pending))
+        logger.info(f"Submitted batch {batch_id} with {len(pending)} jobs.")
+        if self.on_submitted:
+            self.on_submitted(pending)
+        threading.Thread(
+            target=self._collect, args=(batch_id, pending, started), daemon=True
+        ).start()
+
+    def _resume(self, path):
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        batch_id, jobs = manifest["batch_id"], manifest["jobs"]
+        logger.info(f"Resuming batch {batch_id} with {len(jobs)} jobs.")
+        try:
+            results = self._results(batch_id)
+        except Exception as e:
+            logger.error(f"Could not collect batch {batch_id}: {e}")
+            results = {}
+        if results is None:
+            return
+        failed = {id(job) for job in self._apply(jobs, results)}
+        self._track(batch_id, jobs)
+        for job in jobs:
+            self.pipeline.resume(self.stage.name, job, id(job) not in failed)
+
+    def _run(self):
+        for path in glob.glob(os.path.join(self.workdir, "*.json")):
+            threading.Thread(target=self._resume, args=(path,), daemon=True).start()
+        while not self._stopped.wait(self.poll_interval):
+            if self.stage.queue.qsize() > self.threshold:
+                try:
+                    self._drain()
+                except Exception as e:
+                    logger.error(f"Batch drain failed: {e}")
+
+    def start(self):
+        threading.Thread(target=self._run, name="batch", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
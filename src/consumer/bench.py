@@ -0,0 +1,543 @@
+"""
+Offline throughput benchmark for the consumer pipeline.
+
+Runs consumer.py against local stand-ins: an in-memory broker in place of
+RabbitMQ, a fake OpenAI server (chat completions with configurable latency,
+errors and 429s, plus the Files and Batches endpoints the batch evaluator
+uses), and moto for SNS and DynamoDB. Each scenario runs in its own process since
+the consumer configures itself from the environment at import time.
+
+    python bench.py                  # all scenarios
+    python bench.py burst slow_llm   # selected scenarios
+    python bench.py burst --jobs 200 --workers 8
+
+Needs the consumer requirements plus moto. CONSUMER_* variables set in the
+environment are passed through, so the same scenario can be compared across
+settings.
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+SCENARIOS = {
+    "burst": {
+        "jobs": 1000,
+        "llm_latency": 0.05,
+        "error_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        "qualified_rate": 0.3,
+    },
+    "slow_llm": {
+        "jobs": 300,
+        "llm_latency": 1.5,
+        "error_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        "qualified_rate": 0.3,
+    },
+    "flaky_llm": {
+        "jobs": 500,
+        "llm_latency": 0.1,
+        "error_rate": 0.05,
+        "rate_limit_rate": 0.05,
+        "qualified_rate": 0.3,
+    },
+    "batch_backlog": {
+        "jobs": 1000,
+        "llm_latency": 1.0,
+        "error_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        "qualified_rate": 0.3,
+        "batch_latency": 2.0,
+        "env": {
+            "CONSUMER_BATCH_ENABLED": "true",
+            "CONSUMER_BATCH_THRESHOLD": "100",
+            "CONSUMER_BATCH_POLL_INTERVAL": "1",
+            # Enough unacked deliveries for a backlog to build up
+            "CONSUMER_PREFETCH_COUNT": "1000",
+        },
+    },
+}
+PERCENTILES = (50, 95, 99)
+RUN_TIMEOUT = 600
+AWS_REGION = "us-east-1"
+
+WORDS = (
+    "python go java kubernetes backend frontend distributed systems design api "
+    "services cloud data pipelines testing reliability latency storage queues "
+    "customers product team ship features review code mentor debug scale"
+).split()
+BOILERPLATE = (
+    "Benefits\n Medical, dental and vision coverage.\n 401(k) matching.\n"
+    "Equal Opportunity Employer\n We are an equal opportunity employer and "
+    "consider applicants without regard to race, sexual orientation or gender "
+    "identity."
+)
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 4)
+        for p in PERCENTILES
+    }
+
+
+def make_job(index, rng):
+    body = " ".join(rng.choice(WORDS) for _ in range(120))
+    return {
+        "id": f"{index}_bench",
+        "title": f"Software Engineer {index}",
+        "link": f"https://example.com/jobs/{index}",
+        "company": "Bench",
+        "description": (
+            f"Responsibilities\n {body}.\n Qualifications\n "
+            f"Bachelor's degree and {rng.randint(0, 3)} years of experience.\n "
+            f"{BOILERPLATE}"
+        ),
+        "trace": {"discovered": time.time(), "submitted": time.time(), "queued": time.time()},
+    }
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """
+    Answers chat completion requests with a JobEvaluation after `latency`
+    seconds (jittered by ±50%), failing a share of them with a 500 or a 429.
+
+    Also takes uploaded files and batches: a batch completes `batch_latency`
+    seconds after it was created, answering every request in it, and
+    fail_batches makes new batches end as "failed" instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, latency, error_rate, rate_limit_rate, qualified_rate, batch_latency=1.0
+    ):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.qualified_rate = qualified_rate
+        self.batch_latency = batch_latency
+        self.fail_batches = False
+        self.counters = defaultdict(int)
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def completion(self, request):
+        prompt = request["messages"][-1]["content"]
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        qualified = (digest % 1000) / 1000 < self.qualified_rate
+        content = json.dumps({"reasoning": "Benchmark verdict", "is_qualified": qualified})
+        return {
+            "id": f"chatcmpl-{digest % 10**12}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }
+            ],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 30, "total_tokens": 530},
+        }
+
+    def add_file(self, content, purpose, filename="upload.jsonl"):
+        with self.lock:
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "content": content,
+            }
+            return self.files[file_id]
+
+    def batch(self, batch_id):
+        """The batch as it stands now, finishing it once its time is up."""
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None or batch["status"] != "in_progress":
+                return batch
+            if time.monotonic() < batch["_done_at"]:
+                return batch
+            if batch["_fail"]:
+                batch["status"] = "failed"
+                return batch
+            # Other polls see it finalizing while the output is built
+            batch["status"] = "finalizing"
+            lines = self.files[batch["input_file_id"]]["content"].decode().splitlines()
+        output = []
+        for line in filter(str.strip, lines):
+            request = json.loads(line)
+            output.append(
+                json.dumps(
+                    {
+                        "id": f"batch_req_{request['custom_id']}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "request_id": request["custom_id"],
+                            "body": self.completion(request["body"]),
+                        },
+                        "error": None,
+                    }
+                )
+            )
+        self.count("batch_completions", len(output))
+        output_file = self.add_file(
+            "\n".join(output).encode(), "batch_output", f"{batch_id}_output.jsonl"
+        )
+        with self.lock:
+            batch.update(status="completed", output_file_id=output_file["id"])
+            return batch
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _public(self, record):
+        return {
+            key: value
+            for key, value in record.items()
+            if not key.startswith("_") and key != "content"
+        }
+
+    def _upload(self, body):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f'Content-Type: {self.headers["Content-Type"]}\r\n\r\n'.encode() + body
+        )
+        fields = {
+            part.get_param("name", header="content-disposition"): part
+            for part in message.iter_parts()
+        }
+        upload = self.server.add_file(
+            fields["file"].get_payload(decode=True),
+            fields["purpose"].get_content().strip(),
+            fields["file"].get_filename() or "upload.jsonl",
+        )
+        self._reply(200, self._public(upload))
+
+    def _create_batch(self, request):
+        server = self.server
+        server.count("batches")
+        with server.lock:
+            batch_id = f"batch_{len(server.batches) + 1}"
+            server.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"],
+                "completion_window": request["completion_window"],
+                "status": "in_progress",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "_done_at": time.monotonic() + server.batch_latency,
+                "_fail": server.fail_batches,
+            }
+            self._reply(200, self._public(server.batches[batch_id]))
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+            batch = self.server.batch(parts[2])
+            if batch is not None:
+                self._reply(200, self._public(batch))
+                return
+        if parts[:2] == ["v1", "files"] and parts[3:] == ["content"]:
+            upload = self.server.files.get(parts[2])
+            if upload is not None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(upload["content"])))
+                self.end_headers()
+                self.wfile.write(upload["content"])
+                return
+        self._reply(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            self._upload(body)
+            return
+        request = json.loads(body)
+        if self.path == "/v1/batches":
+            self._create_batch(request)
+            return
+        server.count("requests")
+        time.sleep(server.latency * random.uniform(0.5, 1.5))
+        roll = random.random()
+        if roll < server.rate_limit_rate:
+            server.count("rate_limited")
+            self._reply(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"retry-after": "1"},
+            )
+            return
+        if roll < server.rate_limit_rate + server.error_rate:
+            server.count("errors")
+            self._reply(500, {"error": {"message": "Server error", "type": "server_error"}})
+            return
+        server.count("completions")
+        self._reply(200, server.completion(request))
+
+
+class InMemoryBroker:
+    """
+    Stands in for the RabbitMQ channel and connection. Delivers messages to
+    the consumer callback while fewer than `prefetch` are unacked, and runs
+    callbacks scheduled with add_callback_threadsafe on its own loop, the way
+    pika's connection thread does.
+    """
+
+    def __init__(self, prefetch):
+        self.prefetch = prefetch
+        self.messages = deque()
+        self.unacked = {}
+        self.ack_latencies = []
+        self.dead_letters = []
+        self._callbacks = queue.Queue()
+
+    def publish(self, body):
+        self.messages.append(body)
+
+    def basic_ack(self, delivery_tag):
+        delivered_at = self.unacked.pop(delivery_tag)
+        self.ack_latencies.append(time.monotonic() - delivered_at)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.dead_letters.append(body)
+
+    def add_callback_threadsafe(self, callback):
+        self._callbacks.put(callback)
+
+    def run(self, callback, deadline):
+        delivery_tag = 0
+        while time.monotonic() < deadline:
+            while self.messages and len(self.unacked) < self.prefetch:
+                delivery_tag += 1
+                self.unacked[delivery_tag] = time.monotonic()
+                body = self.messages.popleft()
+                callback(self, SimpleNamespace(delivery_tag=delivery_tag), None, body)
+            if not self.messages and not self.unacked:
+                return
+            try:
+                self._callbacks.get(timeout=0.05)()
+            except queue.Empty:
+                continue
+            while not self._callbacks.empty():
+                self._callbacks.get_nowait()()
+
+
+def run_scenario(name, settings):
+    """Runs one scenario in this process and returns its report."""
+    import boto3
+    from moto import mock_aws
+
+    fake_openai = FakeOpenAI(
+        settings["llm_latency"],
+        settings["error_rate"],
+        settings["rate_limit_rate"],
+        settings["qualified_rate"],
+        settings.get("batch_latency", 1.0),
+    )
+    threading.Thread(target=fake_openai.serve_forever, daemon=True).start()
+    workdir = tempfile.mkdtemp(prefix="consumer-bench-")
+
+    with mock_aws():
+        os.environ.update(
+            {
+                "AWS_ACCESS_KEY_ID": "bench",
+                "AWS_SECRET_ACCESS_KEY": "bench",
+                "AWS_REGION": AWS_REGION,
+                "RABBITMQ_PORT": "5672",
+                "RABBITMQ_QUEUE": "bench",
+                "DYNAMODB_TABLE_NAME": "bench-jobs",
+                "OPENAI_API_KEY": "bench",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_openai.server_port}/v1",
+            }
+        )
+        os.environ["SNS_TOPIC_ARN"] = boto3.client(
+            "sns", region_name=AWS_REGION
+        ).create_topic(Name="bench-jobs")["TopicArn"]
+        boto3.client("dynamodb", region_name=AWS_REGION).create_table(
+            TableName="bench-jobs",
+            KeySchema=[{"AttributeName": "JobID", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "JobID", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for key, value in {
+            "CONSUMER_RATE_LIMIT_PER_MINUTE": "100000",
+            "CONSUMER_TOKENS_PER_MINUTE": "100000000",
+            "CONSUMER_METRICS_PORT": "0",
+            "CONSUMER_EVAL_CACHE_PATH": os.path.join(workdir, "eval_cache.db"),
+            "CONSUMER_DEAD_LETTER_SPOOL": os.path.join(workdir, "dead_letters.jsonl"),
+            "CONSUMER_BATCH_DIR": os.path.join(workdir, "batches"),
+            **settings.get("env", {}),
+        }.items():
+            os.environ.setdefault(key, value)
+
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import consumer
+        from prometheus_client import REGISTRY
+
+        batch_seconds = defaultdict(list)
+
+        def on_batch(stage, size, failed, elapsed):
+            batch_seconds[stage].append(elapsed)
+            consumer.metrics.observe_batch(stage, size, failed, elapsed)
+
+        consumer.pipeline.on_batch = on_batch
+        broker = InMemoryBroker(consumer.PREFETCH_COUNT)
+        consumer.acks.bind(broker, broker)
+        rng = random.Random(42)
+        for index in range(settings["jobs"]):
+            broker.publish(json.dumps(make_job(index, rng)))
+
+        consumer.pipeline.start()
+        if consumer.batch_evaluator:
+            consumer.batch_evaluator.start()
+        started = time.monotonic()
+        broker.run(consumer.callback, started + RUN_TIMEOUT)
+        if consumer.batch_evaluator:
+            # Batched jobs are acked on submission; wait for them to finish
+            while len(consumer.pipeline) and time.monotonic() < started + RUN_TIMEOUT:
+                time.sleep(0.1)
+            consumer.batch_evaluator.stop()
+        consumer.pipeline.drain(max(0.0, started + RUN_TIMEOUT - time.monotonic()))
+        elapsed = time.monotonic() - started
+
+        stats = consumer.pipeline.stats()
+        stages = {
+            stage: {
+                key: stats[stage].get(key, 0)
+                for key in ("processed", "failed", "retried", "exhausted")
+            }
+            for stage in consumer.pipeline.stages
+        }
+        for stage, samples in batch_seconds.items():
+            stages[stage]["batch_seconds"] = percentiles(samples)
+        completed = len(broker.ack_latencies)
+        return {
+            "scenario": name,
+            "settings": settings,
+            "prefetch": consumer.PREFETCH_COUNT,
+            "openai_workers": consumer.CONSUMER_OPENAI_WORKERS,
+            "elapsed_seconds": round(elapsed, 2),
+            "jobs_per_second": round(completed / elapsed, 2) if elapsed else 0.0,
+            "acked": completed,
+            "unacked": len(broker.unacked) + len(broker.messages),
+            "dropped": REGISTRY.get_sample_value("consumer_dropped_jobs_total") or 0,
+            "dead_lettered": len(broker.dead_letters),
+            "ack_latency_seconds": percentiles(broker.ack_latencies),
+            "stages": stages,
+            "freshness": consumer.freshness.report()["segments"],
+            "llm": dict(fake_openai.counters),
+            "batch": consumer.batch_evaluator.stats() if consumer.batch_evaluator else {},
+            "max_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+            ),
+        }
+
+
+def print_report(report):
+    print(f'\n== {report["scenario"]} ({report["settings"]["jobs"]} jobs) ==')
+    print(
+        f'{report["jobs_per_second"]} jobs/s over {report["elapsed_seconds"]}s, '
+        f'{report["acked"]} acked, {report["unacked"]} unacked, '
+        f'{report["dropped"]:.0f} dropped, {report["dead_lettered"]} dead-lettered, '
+        f'max RSS {report["max_rss_mb"]} MB'
+    )
+    print(f'prefetch {report["prefetch"]}, {report["openai_workers"]} OpenAI workers, LLM {report["llm"]}')
+    print(f'ack latency {report["ack_latency_seconds"]}')
+    if report["batch"]:
+        print(f'batch evaluator {report["batch"]}')
+    for stage, stats in report["stages"].items():
+        print(f"  stage {stage}: {stats}")
+    for segment, view in report["freshness"].items():
+        print(f"  segment {segment}: {view}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", choices=[[], *SCENARIOS], default=[])
+    parser.add_argument("--jobs", type=int, help="Override the number of jobs")
+    parser.add_argument("--workers", type=int, help="Set CONSUMER_OPENAI_WORKERS")
+    parser.add_argument("--prefetch", type=int, help="Set CONSUMER_PREFETCH_COUNT")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON reports")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        settings = json.loads(args.run)
+        print(json.dumps(run_scenario(settings.pop("name"), settings)))
+        return
+
+    env = dict(os.environ)
+    if args.workers:
+        env["CONSUMER_OPENAI_WORKERS"] = str(args.workers)
+    if args.prefetch:
+        env["CONSUMER_PREFETCH_COUNT"] = str(args.prefetch)
+    for name in args.scenarios or SCENARIOS:
+        settings = {**SCENARIOS[name], "name": name}
+        if args.jobs:
+            settings["jobs"] = args.jobs
+        result = subprocess.run(
+            [sys.executable, __file__, "--run", json.dumps(settings)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(f"Scenario {name} failed:\n{result.stderr[-2000:]}")
+            continue
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print_report(report)
+
+
+if __name__ == "__main__":
+    main()
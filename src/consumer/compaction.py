@@ -0,0 +1,147 @@
+import re
+import threading
+from collections import Counter
+
+CHARS_PER_TOKEN = 4
+MAX_HEADING_LENGTH = 60
+
+# Section headings whose body has no bearing on the qualification criteria
+BOILERPLATE_HEADING = re.compile(
+    r"equal (employment )?opportunit|\beeo\b|diversity|inclusion|accommodation|"
+    r"benefits|perks|what we offer|compensation|pay (range|transparency)|salary|"
+    r"about (us|the company|the team)|who we are|our (culture|values|mission)|"
+    r"life at|why join|privacy|e-verify|disclaimer|legal",
+    re.IGNORECASE,
+)
+# Sections the evaluation actually reads
+RELEVANT_HEADING = re.compile(
+    r"qualification|requirement|experience|education|degree|skills|clearance|"
+    r"what you('ll)? (need|bring)|who you are|must have|minimum|preferred",
+    re.IGNORECASE,
+)
+# Other headings that end a boilerplate section
+SECTION_HEADING = re.compile(
+    r"responsibilit|about (the|this) (role|job|position)|what you('ll| will) do|"
+    r"overview|summary|description|the role|the opportunity",
+    re.IGNORECASE,
+)
+# Boilerplate sentences that show up outside any heading
+BOILERPLATE_LINE = re.compile(
+    r"equal opportunity employer|without regard to (race|age|sex)|"
+    r"reasonable accommodation|e-verify|pay transparency|base (pay|salary) range|"
+    r"401\(?k\)?|paid time off|medical, dental|applicants with (criminal|arrest)|"
+    r"protected veteran|sexual orientation|gender identity",
+    re.IGNORECASE,
+)
+# Whole lines taken as headings even without a trailing colon. Words that
+# double as skills ("Privacy", "Legal") only count with a qualifier or colon.
+KNOWN_HEADING = re.compile(
+    r"equal (employment )?opportunit(y|ies)( employer)?( statement)?|eeo( statement)?|"
+    r"diversity(,? equity)?( (and|&) inclusion)?|(reasonable )?accommodations?|"
+    r"(our |employee )?benefits( (and|&) perks)?|perks( (and|&) benefits)?|what we offer|"
+    r"compensation( (and|&) benefits)?|pay (range|transparency)|salary( range)?|"
+    r"about (us|the company|the team|the role|this role|the job|the position)|"
+    r"who we are|our (culture|values|mission)|life at [\w&. ]+|why join( us| [\w&. ]+)?|"
+    r"privacy (notice|policy|statement)|e-verify|disclaimer|legal (notice|disclaimer)|"
+    r"(minimum |basic |preferred |required |additional )?qualifications|"
+    r"(job )?requirements|education|skills|experience|"
+    r"what you('ll| will)? (need|bring|do)|who you are|must haves?|nice to haves?|"
+    r"(key )?responsibilities|overview|(job )?summary|(job )?description|"
+    r"the role|the opportunity"
+)
+# List items, which are never headings
+BULLET = re.compile(r"^([-*•·▪◦–]|\d+[.)])\s*")
+# Lines that mention a criterion are kept whatever section they are in
+CRITERIA_LINE = re.compile(
+    r"\byears?\b|experience|degree|bachelor|master|ph\.?\s?d|doctor|clearance|"
+    r"secret|\bsci\b|citizen|senior|principal|\blead\b|manager|posted|\bdate\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _is_heading(line):
+    """
+    A short line ending in a colon, or exactly one of KNOWN_HEADING, so an
+    item like "Privacy engineering" stays content. Bullets never are.
+    """
+    if len(line) > MAX_HEADING_LENGTH or BULLET.match(line):
+        return False
+    return line.endswith(":") or KNOWN_HEADING.fullmatch(line.rstrip(" .").lower()) is not None
+
+
+class DescriptionCompactor:
+    """
+    Shrinks job descriptions before they go into the evaluation prompt: drops
+    boilerplate sections (EEO, benefits, pay, company blurbs) and repeated
+    lines, collapses whitespace, and if the result is still over
+    `token_budget` keeps criteria-relevant lines first.
+    """
+
+    def __init__(self, token_budget):
+        self.token_budget = token_budget
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def compact(self, text):
+        lines = []
+        seen = set()
+        skipping = False
+        for raw in re.split(r"\s*\n\s*", text or ""):
+            line = re.sub(r"\s+", " ", raw).strip()
+            if not line:
+                continue
+            if _is_heading(line):
+                if BOILERPLATE_HEADING.search(line) and not RELEVANT_HEADING.search(line):
+                    skipping = True
+                    continue
+                if (
+                    line.endswith(":")
+                    or RELEVANT_HEADING.search(line)
+                    or SECTION_HEADING.search(line)
+                ):
+                    skipping = False
+            relevant = CRITERIA_LINE.search(line) is not None
+            if skipping and not relevant:
+                continue
+            if BOILERPLATE_LINE.search(line) and not relevant:
+                continue
+            if line.lower() in seen:
+                continue
+            seen.add(line.lower())
+            lines.append((line, relevant))
+
+        compacted = "\n".join(line for line, _ in lines)
+        if estimate_tokens(compacted) > self.token_budget:
+            compacted = self._fit(lines)
+        with self._lock:
+            self.counters["jobs"] += 1
+            self.counters["tokens_in"] += estimate_tokens(text or "")
+            self.counters["tokens_out"] += estimate_tokens(compacted)
+        return compacted
+
+    def _fit(self, lines):
+        """Keeps relevant lines first, then others, in their original order."""
+        budget = self.token_budget * CHARS_PER_TOKEN
+        keep = set()
+        for want_relevant in (True, False):
+            for index, (line, relevant) in enumerate(lines):
+                if relevant == want_relevant and len(line) + 1 <= budget:
+                    keep.add(index)
+                    budget -= len(line) + 1
+        return "\n".join(line for index, (line, _) in enumerate(lines) if index in keep)
+
+    def stats(self):
+        with self._lock:
+            tokens_in = self.counters["tokens_in"]
+            return {
+                **self.counters,
+                "reduction": (
+                    round(1 - self.counters["tokens_out"] / tokens_in, 3)
+                    if tokens_in
+                    else 0.0
+                ),
+            }
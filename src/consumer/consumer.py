@@ -1,14 +1,25 @@
 import pika
 import json
-import threading
-import queue
 import time
 import logging
 import boto3
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from pydantic import BaseModel
 import os
 import datetime
+import functools
+from limiter import RateLimiter
+from evalcache import EvaluationCache
+from dedup import NearDuplicateIndex
+from prefilter import Prefilter, load_rules
+from sinks import DynamoDBBatchWriter, SNSBatchPublisher
+from acks import AckTracker
+from pipeline import Pipeline, Stage
+from retry import DeadLetterSpool, RetryPolicy
+from compaction import DescriptionCompactor
+from batch_eval import BatchEvaluator
+import metrics
+from freshness import FreshnessTracker, stamp
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -25,23 +36,92 @@ SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
 DYNAMODB_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME")
 AWS_REGION = os.getenv("AWS_REGION")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+CONSUMER_RATE_LIMIT_PER_MINUTE = int(os.getenv("CONSUMER_RATE_LIMIT_PER_MINUTE", 100))
+CONSUMER_TOKENS_PER_MINUTE = int(os.getenv("CONSUMER_TOKENS_PER_MINUTE", 200000))
+CONSUMER_OPENAI_WORKERS = int(os.getenv("CONSUMER_OPENAI_WORKERS", 4))
+CONSUMER_SNS_WORKERS = int(os.getenv("CONSUMER_SNS_WORKERS", 1))
+CONSUMER_DYNAMODB_WORKERS = int(os.getenv("CONSUMER_DYNAMODB_WORKERS", 1))
+CONSUMER_DRAIN_TIMEOUT = int(os.getenv("CONSUMER_DRAIN_TIMEOUT", 30))
+CONSUMER_COMPACTION_ENABLED = (
+    os.getenv("CONSUMER_COMPACTION_ENABLED", "true").lower() == "true"
+)
+CONSUMER_COMPACTION_TOKEN_BUDGET = int(os.getenv("CONSUMER_COMPACTION_TOKEN_BUDGET", 1500))
+CONSUMER_BATCH_ENABLED = os.getenv("CONSUMER_BATCH_ENABLED", "false").lower() == "true"
+CONSUMER_BATCH_THRESHOLD = int(os.getenv("CONSUMER_BATCH_THRESHOLD", 200))
+CONSUMER_BATCH_MAX_JOBS = int(os.getenv("CONSUMER_BATCH_MAX_JOBS", 1000))
+CONSUMER_BATCH_POLL_INTERVAL = int(os.getenv("CONSUMER_BATCH_POLL_INTERVAL", 30))
+CONSUMER_BATCH_DIR = os.getenv("CONSUMER_BATCH_DIR", "batches")
+CONSUMER_FRESHNESS_SLA = float(os.getenv("CONSUMER_FRESHNESS_SLA", 120))
+CONSUMER_FRESHNESS_WINDOW = int(os.getenv("CONSUMER_FRESHNESS_WINDOW", 1000))
+CONSUMER_METRICS_PORT = int(os.getenv("CONSUMER_METRICS_PORT", 9100))
+CONSUMER_MAX_ATTEMPTS = int(os.getenv("CONSUMER_MAX_ATTEMPTS", 6))
+CONSUMER_RETRY_BASE_DELAY = float(os.getenv("CONSUMER_RETRY_BASE_DELAY", 2))
+CONSUMER_RETRY_MAX_DELAY = float(os.getenv("CONSUMER_RETRY_MAX_DELAY", 120))
+# "rabbitmq" publishes exhausted jobs to <RABBITMQ_QUEUE>.dead, "spool"
+# appends them to CONSUMER_DEAD_LETTER_SPOOL
+CONSUMER_DEAD_LETTER = os.getenv("CONSUMER_DEAD_LETTER", "rabbitmq")
+CONSUMER_DEAD_LETTER_SPOOL = os.getenv("CONSUMER_DEAD_LETTER_SPOOL", "dead_letters.jsonl")
+CONSUMER_PREFILTER_ENABLED = os.getenv("CONSUMER_PREFILTER_ENABLED", "true").lower() == "true"
+CONSUMER_PREFILTER_RULES = os.getenv("CONSUMER_PREFILTER_RULES")
+CONSUMER_EVAL_CACHE_PATH = os.getenv("CONSUMER_EVAL_CACHE_PATH", "eval_cache.db")
+CONSUMER_EVAL_CACHE_SIZE = int(os.getenv("CONSUMER_EVAL_CACHE_SIZE", 5000))
+# Shorter than the prompt's 7-day posting window so date-based verdicts go stale
+CONSUMER_EVAL_CACHE_TTL = int(os.getenv("CONSUMER_EVAL_CACHE_TTL", 2 * 86400))
+CONSUMER_DEDUP_ENABLED = os.getenv("CONSUMER_DEDUP_ENABLED", "true").lower() == "true"
+CONSUMER_DEDUP_WINDOW = int(os.getenv("CONSUMER_DEDUP_WINDOW", 2 * 86400))
+CONSUMER_DEDUP_THRESHOLD = float(os.getenv("CONSUMER_DEDUP_THRESHOLD", 0.8))
+CONSUMER_DEFERRED_ACK = os.getenv("CONSUMER_DEFERRED_ACK", "true").lower() == "true"
 
 # Constants
 QUEUE_MAX_SIZE = 1000
 HEARTBEAT_INTERVAL = 600
 BLOCKED_CONNECTION_TIMEOUT = 300
-PREFETCH_COUNT = 1
 RETRY_DELAY = 2
+COMPLETION_TOKEN_ESTIMATE = 500
+FRESHNESS_REPORT_EVERY = 100
+OPENAI_MODEL = "gpt-4o-mini"
+DYNAMODB_BATCH_SIZE = 25
+SNS_BATCH_SIZE = 10
+SNS_LINGER = float(os.getenv("CONSUMER_SNS_LINGER", 0.2))
+# SNS caps a message at 256 KB; keep headroom for the batch request envelope
+SNS_MAX_MESSAGE_BYTES = 250 * 1024
+TRUNCATED_SUFFIX = " [truncated]"
+DYNAMODB_LINGER = float(os.getenv("CONSUMER_DYNAMODB_LINGER", 0.5))
+# With deferred acks the prefetch window is the number of jobs in flight, so
+# the default keeps every OpenAI worker busy with one more job queued each,
+# plus a full DynamoDB batch waiting on its linger window. Batch mode needs a
+# backlog to build up in memory, so it takes the whole queue.
+if CONSUMER_BATCH_ENABLED:
+    DEFAULT_PREFETCH_COUNT = QUEUE_MAX_SIZE
+elif CONSUMER_DEFERRED_ACK:
+    DEFAULT_PREFETCH_COUNT = 2 * CONSUMER_OPENAI_WORKERS + DYNAMODB_BATCH_SIZE
+else:
+    DEFAULT_PREFETCH_COUNT = 1
+PREFETCH_COUNT = min(
+    QUEUE_MAX_SIZE, int(os.getenv("CONSUMER_PREFETCH_COUNT", DEFAULT_PREFETCH_COUNT))
+)
 
 # Clients
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# No SDK retries: 429s go through the shared limiter's backoff and 5xx through
+# the retry scheduler, instead of each worker sleeping on its own.
+openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 sns_client = boto3.client("sns", region_name=AWS_REGION)
+sns_publisher = SNSBatchPublisher(sns_client, SNS_TOPIC_ARN)
 dynamodb_client = boto3.client("dynamodb", region_name=AWS_REGION)
-
-# Queues with max size 1000
-openai_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
-sns_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
-dynamodb_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+dynamodb_writer = DynamoDBBatchWriter(dynamodb_client, DYNAMODB_TABLE_NAME)
+openai_limiter = RateLimiter(CONSUMER_RATE_LIMIT_PER_MINUTE, CONSUMER_TOKENS_PER_MINUTE)
+evaluation_cache = EvaluationCache(
+    CONSUMER_EVAL_CACHE_PATH, CONSUMER_EVAL_CACHE_SIZE, CONSUMER_EVAL_CACHE_TTL
+)
+near_duplicates = NearDuplicateIndex(CONSUMER_DEDUP_WINDOW, CONSUMER_DEDUP_THRESHOLD)
+acks = AckTracker()
+retry_policy = RetryPolicy(
+    CONSUMER_MAX_ATTEMPTS, CONSUMER_RETRY_BASE_DELAY, CONSUMER_RETRY_MAX_DELAY
+)
+freshness = FreshnessTracker(CONSUMER_FRESHNESS_WINDOW, CONSUMER_FRESHNESS_SLA)
+compactor = DescriptionCompactor(CONSUMER_COMPACTION_TOKEN_BUDGET)
+dead_letter_queue = f"{RABBITMQ_QUEUE}.dead"
+dead_letter_spool = DeadLetterSpool(CONSUMER_DEAD_LETTER_SPOOL)
 
 SYSTEM_PROMPT = """You are an expert job qualification analyzer with perfect accuracy in evaluating job descriptions against specific criteria. You must always provide detailed, structured analysis and boolean decisions based on the given requirements."""
 
@@ -75,108 +155,473 @@ Description: {job_description}
 """
 
 
+prefilter = Prefilter(
+    load_rules(CONSUMER_PREFILTER_RULES) if CONSUMER_PREFILTER_ENABLED else []
+)
+
+
 class JobEvaluation(BaseModel):
     reasoning: str
     is_qualified: bool
 
 
-def openai_worker():
-    while True:
-        job = openai_queue.get()
-        if job is None:
-            break
-        job_title = job["title"]
-        job_description = job["description"]
-        current_date = datetime.datetime.now().strftime('%B %d, %Y')
-        
-        prompt = JOB_EVALUATION_PROMPT.format(
-            current_date=current_date,
-            job_title=job_title,
-            job_description=job_description
+def estimate_tokens(*texts):
+    """Rough token count for rate limiting (about 4 characters per token)."""
+    return sum(len(text) for text in texts) // 4 + COMPLETION_TOKEN_ESTIMATE
+
+
+def evaluation_key(job):
+    """Evaluation cache key, on the compacted description when there is one."""
+    return evaluation_cache.key(
+        job["title"], job.get("_compact_description", job["description"])
+    )
+
+
+def evaluation_messages(job):
+    current_date = datetime.datetime.now().strftime('%B %d, %Y')
+    prompt = JOB_EVALUATION_PROMPT.format(
+        current_date=current_date,
+        job_title=job["title"],
+        job_description=job.get("_compact_description", job["description"]),
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def cached_evaluation(job):
+    cached = evaluation_cache.get(evaluation_key(job))
+    if cached is None:
+        return None
+    logger.info(
+        f'Job ID: {job["id"]} evaluation served from cache. '
+        f"Cache stats: {evaluation_cache.stats()}"
+    )
+    return JobEvaluation(**cached)
+
+
+def evaluate_job(job):
+    """
+    Returns the JobEvaluation for a job, from the evaluation cache when the
+    same title and description were evaluated recently, else from the LLM.
+    Uses the compacted description when the compaction stage produced one.
+    """
+    cached = cached_evaluation(job)
+    if cached is not None:
+        return cached
+
+    messages = evaluation_messages(job)
+    openai_limiter.acquire(
+        estimate_tokens(*(message["content"] for message in messages))
+    )
+    response = openai_client.beta.chat.completions.parse(
+        model=OPENAI_MODEL,
+        messages=messages,
+        response_format=JobEvaluation,
+    )
+    openai_limiter.success()
+    evaluation = response.choices[0].message.parsed
+    evaluation_cache.put(evaluation_key(job), evaluation.dict())
+    return evaluation
+
+
+def record_evaluation(job, evaluation):
+    job["evaluation"] = evaluation.dict()
+    stamp(job, "evaluated", time.time())
+    if evaluation.is_qualified:
+        logger.info(f'Job ID: {job["id"]} added to SNS and DynamoDB queues.')
+    else:
+        logger.info(
+            f'Job ID: {job["id"]} is not qualified. Reason: {evaluation.reasoning}'
         )
-        try:
-            response = openai_client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format=JobEvaluation,
+
+
+def batch_request_body(job):
+    """Batch API request for a job, or None when the cache already has it."""
+    cached = cached_evaluation(job)
+    if cached is not None:
+        record_evaluation(job, cached)
+        return None
+    schema = JobEvaluation.model_json_schema()
+    return {
+        "model": OPENAI_MODEL,
+        "messages": evaluation_messages(job),
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "JobEvaluation",
+                "strict": True,
+                "schema": {**schema, "additionalProperties": False},
+            },
+        },
+    }
+
+
+def apply_batch_result(job, content):
+    evaluation = JobEvaluation.model_validate_json(content)
+    evaluation_cache.put(evaluation_key(job), evaluation.dict())
+    record_evaluation(job, evaluation)
+
+
+def release_batched_jobs(jobs):
+    """
+    Acks jobs once their batch is accepted: batches can outlast RabbitMQ's
+    delivery ack timeout, and the batch manifest now carries them.
+    """
+    for job in jobs:
+        acks.done(job.pop("_delivery_tag", None))
+
+
+def compact_jobs(jobs):
+    """
+    Compaction stage handler. Keeps the original description for the sinks,
+    and flags near-duplicates on the compacted text so shared boilerplate
+    (EEO, benefits, company blurbs) does not make distinct roles look alike.
+    """
+    for job in jobs:
+        compacted = compactor.compact(job["description"])
+        if CONSUMER_COMPACTION_ENABLED:
+            job["_compact_description"] = compacted
+            logger.info(
+                f'Job ID: {job["id"]} description compacted from '
+                f'{estimate_tokens(job["description"]) - COMPLETION_TOKEN_ESTIMATE} to '
+                f'{estimate_tokens(compacted) - COMPLETION_TOKEN_ESTIMATE} '
+                f'tokens. Overall reduction: {compactor.stats()["reduction"]}'
+            )
+        if CONSUMER_DEDUP_ENABLED and "_duplicate_of" not in job:
+            duplicate_of = near_duplicates.check_and_add(
+                job["id"], f'{job["title"]}\n{compacted}'
             )
-            evaluation = response.choices[0].message.parsed
-            job["evaluation"] = evaluation.dict()
-            if evaluation.is_qualified:
-                sns_queue.put(job)
-                dynamodb_queue.put(job)
-                logger.info(f'Job ID: {job["id"]} added to SNS and DynamoDB queues.')
-            else:
+            if duplicate_of is not None:
+                job["_duplicate_of"] = duplicate_of
                 logger.info(
-                    f'Job ID: {job["id"]} is not qualified. Reason: {evaluation.reasoning}'
+                    f'Job ID: {job["id"]} is a near-duplicate of job ID {duplicate_of}. Skipping.'
                 )
-        except Exception as e:
-            logger.error(f'Failed to evaluate job ID {job["id"]}: {e}')
-            time.sleep(RETRY_DELAY)
-            openai_queue.put(job)
-        finally:
-            openai_queue.task_done()
+                metrics.FILTERED_JOBS.labels("near_duplicate").inc()
+    return []
 
 
-def sns_worker():
-    while True:
-        job = sns_queue.get()
-        if job is None:
-            break
+def is_original(job):
+    return "_duplicate_of" not in job
+
+
+def evaluate_jobs(jobs):
+    """Evaluation stage handler. Returns the jobs to retry."""
+    failed = []
+    for job in jobs:
         try:
-            sns_client.publish(
-                TopicArn=SNS_TOPIC_ARN, Message=json.dumps(job, default=str)
+            record_evaluation(job, evaluate_job(job))
+        except RateLimitError as e:
+            retry_after = e.response.headers.get("retry-after")
+            delay = openai_limiter.backoff(float(retry_after) if retry_after else None)
+            logger.warning(
+                f'Rate limited while evaluating job ID {job["id"]}, backing off {delay}s.'
             )
-            logger.info(f'Job ID: {job["id"]} sent to SNS.')
+            failed.append(job)
         except Exception as e:
-            logger.error(f'Failed to send job ID {job["id"]} to SNS: {e}')
-            time.sleep(RETRY_DELAY)
-            sns_queue.put(job)
-        finally:
-            sns_queue.task_done()
+            logger.error(f'Failed to evaluate job ID {job["id"]}: {e}')
+            failed.append(job)
+    return failed
+
 
+def is_qualified(job):
+    return job["evaluation"]["is_qualified"]
 
-def dynamodb_worker():
-    while True:
-        job = dynamodb_queue.get()
-        if job is None:
-            break
-        evaluation = job.get("evaluation", {})
+
+def sns_message(job):
+    """
+    Serializes a job for SNS, trimming the description so the message fits
+    the SNS size limit. Keys starting with an underscore are internal
+    bookkeeping and are left out.
+    """
+    job = {key: value for key, value in job.items() if not key.startswith("_")}
+    message = json.dumps(job, default=str)
+    if len(message.encode()) <= SNS_MAX_MESSAGE_BYTES:
+        return message
+    description = job["description"]
+    low, high = 0, len(description)
+    while low < high:
+        keep = (low + high + 1) // 2
+        trimmed = {**job, "description": description[:keep] + TRUNCATED_SUFFIX}
+        if len(json.dumps(trimmed, default=str).encode()) <= SNS_MAX_MESSAGE_BYTES:
+            low = keep
+        else:
+            high = keep - 1
+    return json.dumps(
+        {**job, "description": description[:low] + TRUNCATED_SUFFIX}, default=str
+    )
+
+
+def publish_to_sns(jobs):
+    """SNS stage handler. Returns the jobs to retry."""
+    by_id = {job["id"]: job for job in jobs}
+    try:
+        failed, rejected = sns_publisher.publish(
+            [(job_id, sns_message(job)) for job_id, job in by_id.items()]
+        )
+    except Exception as e:
+        logger.error(f"Failed to send {len(by_id)} jobs to SNS: {e}")
+        return jobs
+    notified_at = time.time()
+    for job in jobs:
+        if job["id"] not in failed and job["id"] not in rejected:
+            stamp(job, "notified", notified_at)
+    for job_id in by_id.keys() - set(failed) - set(rejected):
+        logger.info(f"Job ID: {job_id} sent to SNS.")
+    if rejected:
+        logger.error(f"SNS rejected job IDs {rejected}, dropping them.")
+    if failed:
+        logger.error(f"Failed to send job IDs {failed} to SNS, re-queueing.")
+    return [job for job in jobs if job["id"] in failed]
+
+
+def dynamodb_item(job):
+    evaluation = job.get("evaluation", {})
+    return {
+        "JobID": {"S": job["id"]},
+        "JobTitle": {"S": job["title"]},
+        "JobDescription": {"S": job["description"]},
+        "Link": {"S": job["link"]},
+        "Company": {"S": job["company"]},
+        "Reasoning": {"S": evaluation.get("reasoning", "")},
+        "IsQualified": {"BOOL": evaluation.get("is_qualified", False)},
+        "DateAdded": {"N": str(int(datetime.datetime.now().timestamp()))},
+        "Processed": {"S": "No"},
+    }
+
+
+def store_in_dynamodb(jobs):
+    """DynamoDB stage handler. Returns the jobs to retry."""
+    # BatchWriteItem rejects a batch with two puts for the same key
+    by_id = {job["id"]: job for job in jobs}
+    try:
+        unprocessed = dynamodb_writer.write(
+            [dynamodb_item(job) for job in by_id.values()]
+        )
+    except Exception as e:
+        logger.error(f"Failed to store {len(by_id)} jobs in DynamoDB: {e}")
+        return jobs
+    failed_ids = {item["JobID"]["S"] for item in unprocessed}
+    stored_at = time.time()
+    for job in jobs:
+        if job["id"] not in failed_ids:
+            stamp(job, "stored", stored_at)
+    for job_id in by_id.keys() - failed_ids:
+        logger.info(f"Job ID: {job_id} stored in DynamoDB.")
+    if failed_ids:
+        logger.error(f"{len(failed_ids)} jobs left unprocessed by DynamoDB, re-queueing.")
+    return [job for job in jobs if job["id"] in failed_ids]
+
+
+def dead_letter(stage, job):
+    """
+    Parks a job that ran out of retries in `stage`. The RabbitMQ publish is
+    scheduled on the connection thread ahead of the job's own ack. If the
+    spool cannot be written the delivery is requeued rather than acked.
+    """
+    record = {
+        **{key: value for key, value in job.items() if not key.startswith("_")},
+        "dead_letter": {
+            "stage": stage,
+            "attempts": job.get("_attempts", {}).get(stage),
+            "time": datetime.datetime.now().isoformat(),
+        },
+    }
+    if CONSUMER_DEAD_LETTER == "rabbitmq" and acks.connection is not None:
+        acks.connection.add_callback_threadsafe(
+            functools.partial(
+                acks.channel.basic_publish,
+                exchange="",
+                routing_key=dead_letter_queue,
+                body=json.dumps(record, default=str),
+                properties=pika.BasicProperties(delivery_mode=2),
+            )
+        )
+        logger.error(
+            f'Job ID: {job["id"]} exhausted retries in {stage}, '
+            f"sent to {dead_letter_queue}."
+        )
+    else:
         try:
-            dynamodb_client.put_item(
-                TableName=DYNAMODB_TABLE_NAME,
-                Item={
-                    "JobID": {"S": job["id"]},
-                    "JobTitle": {"S": job["title"]},
-                    "JobDescription": {"S": job["description"]},
-                    "Link": {"S": job["link"]},
-                    "Company": {"S": job["company"]},
-                    "Reasoning": {"S": evaluation.get("reasoning", "")},
-                    "IsQualified": {"BOOL": evaluation.get("is_qualified", False)},
-                    "DateAdded": {"N": str(int(datetime.datetime.now().timestamp()))},
-                    "Processed": {"S": "No"},
-                },
+            dead_letter_spool.write(record)
+        except Exception:
+            acks.requeue(job.get("_delivery_tag"))
+            raise
+        logger.error(
+            f'Job ID: {job["id"]} exhausted retries in {stage}, '
+            f"spooled to {dead_letter_spool.path}."
+        )
+
+
+def fork_job(job):
+    """
+    Copy of a job for one fan-out branch, with its own trace and retry
+    counts, so the SNS and DynamoDB threads never touch the same dict.
+    """
+    branch = dict(job)
+    for key in ("trace", "_attempts"):
+        if key in job:
+            branch[key] = dict(job[key])
+    return branch
+
+
+def join_job(job, branch):
+    """Keeps the timestamps a branch added, for the freshness report."""
+    job.setdefault("trace", {}).update(branch.get("trace") or {})
+
+
+def finish_job(job):
+    """Runs once a job has left the pipeline."""
+    acks.done(job.get("_delivery_tag"))
+    if batch_evaluator:
+        batch_evaluator.finished(job)
+    durations = freshness.record(job.get("trace"))
+    metrics.observe_freshness(durations)
+    if "end_to_end" in durations:
+        logger.info(
+            f'Job ID: {job["id"]} notified {durations["end_to_end"]:.1f}s after discovery.'
+        )
+    if freshness.counters["jobs"] % FRESHNESS_REPORT_EVERY == 0:
+        logger.info(f"Freshness report: {freshness.report()}")
+
+
+def build_pipeline():
+    """
+    Compaction (and near-duplicate detection) feeds evaluation, which fans
+    out to SNS and DynamoDB for qualified jobs. New sinks are added here as
+    another Stage listed in the evaluation stage's downstream.
+    """
+    stages = []
+    if CONSUMER_COMPACTION_ENABLED or CONSUMER_DEDUP_ENABLED:
+        stages.append(
+            Stage(
+                "compact",
+                compact_jobs,
+                maxsize=QUEUE_MAX_SIZE,
+                batch_size=10,
+                retry=retry_policy,
+                downstream=["openai"],
+                forward=is_original,
             )
-            logger.info(f'Job ID: {job["id"]} stored in DynamoDB.')
-        except Exception as e:
-            logger.error(f'Failed to store job ID {job["id"]} in DynamoDB: {e}')
-            time.sleep(RETRY_DELAY)
-            dynamodb_queue.put(job)
-        finally:
-            dynamodb_queue.task_done()
+        )
+    return Pipeline(
+        [
+            *stages,
+            Stage(
+                "openai",
+                evaluate_jobs,
+                concurrency=CONSUMER_OPENAI_WORKERS,
+                maxsize=QUEUE_MAX_SIZE,
+                retry=retry_policy,
+                downstream=["sns", "dynamodb"],
+                forward=is_qualified,
+            ),
+            Stage(
+                "sns",
+                publish_to_sns,
+                concurrency=CONSUMER_SNS_WORKERS,
+                maxsize=QUEUE_MAX_SIZE,
+                batch_size=SNS_BATCH_SIZE,
+                linger=SNS_LINGER,
+                retry=retry_policy,
+            ),
+            Stage(
+                "dynamodb",
+                store_in_dynamodb,
+                concurrency=CONSUMER_DYNAMODB_WORKERS,
+                maxsize=QUEUE_MAX_SIZE,
+                batch_size=DYNAMODB_BATCH_SIZE,
+                linger=DYNAMODB_LINGER,
+                retry=retry_policy,
+            ),
+        ],
+        on_complete=finish_job,
+        on_exhausted=dead_letter,
+        on_batch=metrics.observe_batch,
+        fork=fork_job,
+        join=join_job,
+    )
+
+
+pipeline = build_pipeline()
+batch_evaluator = None
+if CONSUMER_BATCH_ENABLED:
+    batch_evaluator = BatchEvaluator(
+        openai_client,
+        pipeline,
+        "openai",
+        batch_request_body,
+        apply_batch_result,
+        on_submitted=release_batched_jobs,
+        threshold=CONSUMER_BATCH_THRESHOLD,
+        max_jobs=CONSUMER_BATCH_MAX_JOBS,
+        poll_interval=CONSUMER_BATCH_POLL_INTERVAL,
+        workdir=CONSUMER_BATCH_DIR,
+    )
+
+
+def metrics_gauges():
+    gauges = {
+        "consumer_eval_cache_hit_rate": (
+            "Share of evaluation cache lookups served from the cache",
+            lambda: evaluation_cache.stats()["hit_rate"],
+        ),
+        "consumer_compaction_tokens_in": (
+            "Estimated description tokens before compaction",
+            lambda: compactor.stats().get("tokens_in", 0),
+        ),
+        "consumer_compaction_tokens_out": (
+            "Estimated description tokens after compaction",
+            lambda: compactor.stats().get("tokens_out", 0),
+        ),
+        "consumer_freshness_sla_met": (
+            "Share of notified jobs that met CONSUMER_FRESHNESS_SLA end to end",
+            lambda: freshness.report()["sla_met"],
+        ),
+        "consumer_unacked_jobs": (
+            "Deliveries waiting for their job to leave the pipeline",
+            lambda: len(acks),
+        ),
+    }
+    if batch_evaluator:
+        gauges["consumer_batch_jobs_submitted"] = (
+            "Jobs submitted through the Batch API",
+            lambda: batch_evaluator.stats().get("jobs_submitted", 0),
+        )
+    return gauges
 
 
 def callback(ch, method, _, body):
     job = json.loads(body)
-    if openai_queue.full():
-        openai_queue.get_nowait()
+    stamp(job, "received", time.time())
+    rule = prefilter.check(job)
+    if rule is not None:
+        job["evaluation"] = {
+            "reasoning": f"Pre-filter ({rule['name']}): {rule['reason']}",
+            "is_qualified": False,
+        }
+        logger.info(
+            f'Job ID: {job["id"]} rejected by pre-filter rule {rule["name"]}. '
+            f'Hits: {prefilter.hits[rule["name"]]}/{prefilter.hits["checked"]}'
+        )
+        metrics.FILTERED_JOBS.labels("prefilter").inc()
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        return
+    if CONSUMER_DEFERRED_ACK:
+        # Acked once the job leaves the pipeline. The prefetch window caps
+        # unacked deliveries below QUEUE_MAX_SIZE, so this put does not block
+        # and a slow stage holds back the broker instead of dropping jobs.
+        job["_delivery_tag"] = method.delivery_tag
+        acks.track(method.delivery_tag)
+        pipeline.submit(job)
+        logger.info(f'Job ID: {job["id"]} added to OpenAI queue.')
+        return
+    if pipeline.submit(job, drop_oldest=True) is not None:
         logger.warning(
             "OpenAI queue is full. Dropping the oldest job to add the new job."
         )
-    openai_queue.put_nowait(job)
+        metrics.DROPPED_JOBS.inc()
     logger.info(f'Job ID: {job["id"]} added to OpenAI queue.')
     ch.basic_ack(delivery_tag=method.delivery_tag)
 
@@ -205,27 +650,34 @@ def main():
 
     channel = connection.channel()
     channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+    if CONSUMER_DEAD_LETTER == "rabbitmq":
+        channel.queue_declare(queue=dead_letter_queue, durable=True)
     channel.basic_qos(prefetch_count=PREFETCH_COUNT)
+    acks.bind(connection, channel)
+    logger.info(
+        f"Prefetch count {PREFETCH_COUNT}, deferred acks "
+        f'{"enabled" if CONSUMER_DEFERRED_ACK else "disabled"}.'
+    )
     channel.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=callback)
 
-    openai_thread = threading.Thread(target=openai_worker)
-    sns_thread = threading.Thread(target=sns_worker)
-    dynamodb_thread = threading.Thread(target=dynamodb_worker)
-
-    for t in [openai_thread, sns_thread, dynamodb_thread]:
-        t.daemon = True
-        t.start()
-
+    if CONSUMER_METRICS_PORT:
+        metrics.serve(CONSUMER_METRICS_PORT, pipeline, metrics_gauges())
+        logger.info(f"Serving metrics on port {CONSUMER_METRICS_PORT}.")
+    pipeline.start()
+    if batch_evaluator:
+        batch_evaluator.start()
     try:
         channel.start_consuming()
     except KeyboardInterrupt:
         pass
     finally:
-        openai_queue.put(None)
-        sns_queue.put(None)
-        dynamodb_queue.put(None)
-        for q in [openai_queue, sns_queue, dynamodb_queue]:
-            q.join()
+        if batch_evaluator:
+            batch_evaluator.stop()
+            logger.info(f"Batch evaluator stats: {batch_evaluator.stats()}")
+        pipeline.drain(CONSUMER_DRAIN_TIMEOUT)
+        logger.info(f"Pipeline stats at shutdown: {pipeline.stats()}")
+        # Flush acks the workers scheduled after consuming stopped
+        connection.process_data_events(time_limit=0)
         connection.close()
 
 
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+NUM_BINS = 64
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+SHINGLE_SIZE = 5
+EMPTY_BIN = 1 << 64
+
+
+def normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def shingles(text):
+    words = normalize(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return {hash(" ".join(words))} if words else set()
+    return {
+        hash(" ".join(words[i : i + SHINGLE_SIZE]))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(hashes):
+    """
+    One-permutation MinHash: each shingle hash lands in one of NUM_BINS bins
+    and every bin keeps its minimum, so a signature costs a single pass over
+    the shingles. Empty bins borrow from the next non-empty bin
+    (densification) so the signature stays usable for LSH banding.
+    """
+    signature = [EMPTY_BIN] * NUM_BINS
+    for h in hashes:
+        h &= 0xFFFFFFFFFFFFFFFF
+        index = h % NUM_BINS
+        value = h // NUM_BINS
+        if value < signature[index]:
+            signature[index] = value
+    for index in range(NUM_BINS):
+        offset = 1
+        while signature[index] == EMPTY_BIN and offset < NUM_BINS:
+            borrowed = signature[(index + offset) % NUM_BINS]
+            if borrowed != EMPTY_BIN:
+                signature[index] = borrowed + offset * EMPTY_BIN
+            offset += 1
+    return tuple(signature)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over the jobs seen in the last `window` seconds. The 64
+    signature bins are split into 16 bands of 4; jobs sharing any band are
+    candidates, and a candidate whose estimated Jaccard similarity reaches
+    `threshold` is reported as a near-duplicate. Identical text under a new
+    job ID is reported without comparing signatures.
+    """
+
+    def __init__(self, window, threshold):
+        self.window = window
+        self.threshold = threshold
+        self._buckets = defaultdict(set)
+        self._entries = {}
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def _bands(self, signature):
+        return [
+            (band, hash(signature[band * ROWS : (band + 1) * ROWS]))
+            for band in range(BANDS)
+        ]
+
+    def _expire(self, now):
+        while self._order and self._order[0][0] < now - self.window:
+            _, job_id = self._order.popleft()
+            _, bands, _ = self._entries.pop(job_id)
+            for band in bands:
+                self._buckets[band].discard(job_id)
+                if not self._buckets[band]:
+                    del self._buckets[band]
+
+    def check_and_add(self, job_id, text):
+        """
+        Returns the ID of an earlier near-duplicate of `text`, or None after
+        adding the job to the index.
+        """
+        hashes = shingles(text)
+        if not hashes:
+            return None
+        signature = minhash(hashes)
+        bands = self._bands(signature)
+        digest = hash(normalize(text))
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if job_id in self._entries:
+                return None
+            candidates = set()
+            for band in bands:
+                candidates |= self._buckets.get(band, set())
+            for candidate in candidates:
+                other, _, other_digest = self._entries[candidate]
+                if other_digest == digest:
+                    return candidate
+                similarity = (
+                    sum(x == y for x, y in zip(signature, other)) / NUM_BINS
+                )
+                if similarity >= self.threshold:
+                    return candidate
+            self._entries[job_id] = (signature, bands, digest)
+            self._order.append((now, job_id))
+            for band in bands:
+                self._buckets[band].add(job_id)
+            return None
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+class EvaluationCache:
+    """
+    Two-tier cache of job evaluations keyed by a hash of the normalized title
+    and description: an in-memory LRU in front of a SQLite table. Entries
+    expire after `ttl` seconds in both tiers.
+    """
+
+    def __init__(self, path, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.counters = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS evaluations "
+            "(key TEXT PRIMARY KEY, evaluation TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("DELETE FROM evaluations WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+
+    @staticmethod
+    def key(title, description):
+        normalized = "\n".join(
+            re.sub(r"\s+", " ", text or "").strip().lower()
+            for text in (title, description)
+        )
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _remember(self, key, evaluation, expires_at):
+        self._memory[key] = (expires_at, evaluation)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] >= now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            row = self._db.execute(
+                "SELECT evaluation, expires_at FROM evaluations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] >= now:
+                evaluation = json.loads(row[0])
+                self._remember(key, evaluation, row[1])
+                self.counters["disk_hits"] += 1
+                return evaluation
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key, evaluation):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, evaluation, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?)",
+                (key, json.dumps(evaluation), expires_at),
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.counters.values())
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
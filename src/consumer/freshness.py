@@ -0,0 +1,81 @@
+import threading
+from collections import Counter, deque
+
+# (segment, from stamp, to stamp) over a job's trace. Producer stamps come
+# from another host, so segments that cross machines include clock skew.
+SEGMENTS = [
+    ("crawl", "discovered", "submitted"),
+    ("queue_api", "submitted", "queued"),
+    ("broker", "queued", "received"),
+    ("evaluation", "received", "evaluated"),
+    ("notification", "evaluated", "notified"),
+    ("storage", "evaluated", "stored"),
+    ("end_to_end", "discovered", "notified"),
+]
+PERCENTILES = (50, 95, 99)
+
+
+def stamp(job, event, at):
+    job.setdefault("trace", {})[event] = at
+
+
+def segments(trace):
+    """Returns {segment: seconds} for the segments the trace has both ends of."""
+    return {
+        name: trace[end] - trace[start]
+        for name, start, end in SEGMENTS
+        if start in trace and end in trace
+    }
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class FreshnessTracker:
+    """
+    Keeps the last `window` durations of every trace segment for a p50/p95/p99
+    view, and counts notified jobs whose end-to-end latency broke `sla`
+    seconds.
+    """
+
+    def __init__(self, window, sla):
+        self.sla = sla
+        self.counters = Counter()
+        self._samples = {name: deque(maxlen=window) for name, _, _ in SEGMENTS}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        durations = segments(trace or {})
+        with self._lock:
+            self.counters["jobs"] += 1
+            for name, seconds in durations.items():
+                self._samples[name].append(seconds)
+            if "end_to_end" in durations:
+                self.counters["notified"] += 1
+                if durations["end_to_end"] > self.sla:
+                    self.counters["sla_breaches"] += 1
+        return durations
+
+    def report(self):
+        with self._lock:
+            view = {
+                name: {
+                    f"p{p}": round(percentile(samples, p), 3) for p in PERCENTILES
+                }
+                for name, samples in self._samples.items()
+                if samples
+            }
+            notified = self.counters["notified"]
+            return {
+                "segments": view,
+                **self.counters,
+                "sla_seconds": self.sla,
+                "sla_met": (
+                    round(1 - self.counters["sla_breaches"] / notified, 3)
+                    if notified
+                    else 1.0
+                ),
+            }
@@ -0,0 +1,67 @@
+import threading
+import time
+
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` / 60 tokens
+    per second. reserve() takes tokens right away, letting the balance go
+    negative, and returns how long the caller has to wait for them.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """
+    Shared requests/minute and tokens/minute limiter for the OpenAI workers,
+    with an adaptive pause that doubles on every consecutive 429.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, retry_after=None):
+        with self._lock:
+            self._backoff = min(BACKOFF_MAX, max(BACKOFF_BASE, self._backoff * 2))
+            delay = retry_after if retry_after else self._backoff
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+
+    def success(self):
+        with self._lock:
+            self._backoff = 0.0
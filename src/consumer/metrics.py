@@ -0,0 +1,95 @@
+import prometheus_client
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_LATENCY = prometheus_client.Histogram(
+    "consumer_stage_latency_seconds",
+    "Time a pipeline stage spends on one batch",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+DROPPED_JOBS = prometheus_client.Counter(
+    "consumer_dropped_jobs_total",
+    "Jobs dropped by the callback overflow path",
+)
+FILTERED_JOBS = prometheus_client.Counter(
+    "consumer_filtered_jobs_total",
+    "Jobs settled in the callback without entering the pipeline",
+    ["reason"],
+)
+
+FRESHNESS = prometheus_client.Histogram(
+    "consumer_freshness_seconds",
+    "Time between two points of a job's trace, from discovery to notification",
+    ["segment"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 90, 120, 180, 300, 600, 1800),
+)
+
+
+def observe_freshness(durations):
+    for segment, seconds in durations.items():
+        FRESHNESS.labels(segment).observe(seconds)
+
+
+def observe_batch(stage, size, failed, elapsed):
+    STAGE_LATENCY.labels(stage).observe(elapsed)
+
+
+class StatsCollector:
+    """
+    Exports the pipeline's own counters at scrape time, so the stages keep a
+    single source of truth. `gauges` maps a metric name to (help, callable)
+    for any other number worth exposing.
+    """
+
+    STAGE_COUNTERS = {
+        "processed": "Items a stage finished successfully",
+        "failed": "Items a stage failed on",
+        "retried": "Items a stage scheduled for a retry",
+        "exhausted": "Items that ran out of retries in a stage",
+    }
+
+    def __init__(self, pipeline, gauges=None):
+        self.pipeline = pipeline
+        self.gauges = gauges or {}
+
+    def collect(self):
+        depth = GaugeMetricFamily(
+            "consumer_stage_queue_depth", "Items queued on a stage", labels=["stage"]
+        )
+        retry_pending = GaugeMetricFamily(
+            "consumer_stage_retry_pending",
+            "Items waiting on the retry timer for a stage",
+            labels=["stage"],
+        )
+        counters = {
+            key: CounterMetricFamily(f"consumer_stage_{key}", help, labels=["stage"])
+            for key, help in self.STAGE_COUNTERS.items()
+        }
+        for name, stage in self.pipeline.stages.items():
+            stats = stage.stats()
+            depth.add_metric([name], stats["depth"])
+            retry_pending.add_metric([name], stats["retry_pending"])
+            for key, family in counters.items():
+                family.add_metric([name], stats.get(key, 0))
+        yield depth
+        yield retry_pending
+        yield from counters.values()
+        yield GaugeMetricFamily(
+            "consumer_retry_queue_depth",
+            "Retries waiting on the timer heap",
+            value=len(self.pipeline.scheduler),
+        )
+        yield GaugeMetricFamily(
+            "consumer_inflight_jobs",
+            "Jobs submitted to the pipeline and not yet finished",
+            value=len(self.pipeline),
+        )
+        for name, (help, value) in self.gauges.items():
+            yield GaugeMetricFamily(name, help, value=value())
+
+
+def serve(port, pipeline, gauges=None):
+    REGISTRY.register(StatsCollector(pipeline, gauges))
+    prometheus_client.start_http_server(port)
@@ -0,0 +1,384 @@
+import copy
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from retry import RetryPolicy, RetryScheduler
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.2
+
+
+class Stage:
+    """
+    One step of the consumer pipeline: a bounded input queue drained by
+    `concurrency` worker threads. handler(items) gets up to `batch_size`
+    items, collected for at most `linger` seconds after the first, and
+    returns the items that failed. The others are passed to every
+    `downstream` stage when forward(item) is true, and leave the pipeline
+    otherwise. Failed items are retried per `retry` on the pipeline's timer
+    heap; items out of attempts are handed to the pipeline's on_exhausted.
+    """
+
+    def __init__(
+        self,
+        name,
+        handler,
+        concurrency=1,
+        maxsize=1000,
+        batch_size=1,
+        linger=0.0,
+        retry=None,
+        downstream=(),
+        forward=None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retry = retry or RetryPolicy()
+        self.downstream = list(downstream)
+        self.forward = forward or (lambda item: True)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.pipeline = None
+        self.metrics = Counter()
+        self.latency_max = 0.0
+        self._pending = 0
+        self._retry_pending = 0
+        self._idle = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def put(self, item):
+        """Blocks while the stage is full, pushing back on the caller."""
+        with self._idle:
+            self._pending += 1
+        self.queue.put(item)
+
+    def drop_oldest(self):
+        """Removes and returns the oldest queued item, or None when empty."""
+        try:
+            item = self.queue.get_nowait()
+        except queue.Empty:
+            return None
+        self._finish(1)
+        return item
+
+    def _finish(self, count):
+        with self._idle:
+            self._pending -= count
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _next_batch(self):
+        """
+        Waits for the first item, then keeps collecting until batch_size or
+        the linger deadline. Returns an empty batch once the stage is stopped.
+        """
+        items = []
+        deadline = None
+        while len(items) < self.batch_size:
+            if deadline is None:
+                timeout = POLL_INTERVAL
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            try:
+                items.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                if deadline is not None or self._stopped.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.linger
+        return items
+
+    def _work(self):
+        while True:
+            items = self._next_batch()
+            if not items:
+                if self._stopped.is_set():
+                    return
+                continue
+            started = time.monotonic()
+            try:
+                failed = self.handler(items) or []
+            except Exception as e:
+                logger.error(f"Stage {self.name} failed on {len(items)} items: {e}")
+                failed = items
+            try:
+                self.complete(items, failed, time.monotonic() - started)
+            except Exception as e:
+                logger.error(f"Stage {self.name} could not complete {len(items)} items: {e}")
+
+    def take(self, max_items):
+        """
+        Removes up to max_items of the oldest queued items so they can be
+        processed outside the stage's workers. They stop counting as pending
+        right away, so drain() does not wait on work that may outlive it;
+        hand them back with complete(..., taken=True).
+        """
+        items = []
+        while len(items) < max_items:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if items:
+            self._finish(len(items))
+        return items
+
+    def complete(self, items, failed, elapsed, taken=False):
+        """
+        Forwards the items that succeeded and schedules retries for the rest.
+        The items stop counting as pending even if a hook raises; `taken`
+        items already did when take() returned them.
+        """
+        failed_ids = {id(item) for item in failed}
+        with self._idle:
+            self.metrics["batches"] += 1
+            self.metrics["processed"] += len(items) - len(failed_ids)
+            self.metrics["failed"] += len(failed_ids)
+            self.metrics["latency_seconds"] += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+        try:
+            if self.pipeline.on_batch:
+                try:
+                    self.pipeline.on_batch(self.name, len(items), len(failed_ids), elapsed)
+                except Exception as e:
+                    logger.error(f"on_batch failed for stage {self.name}: {e}")
+            for item in items:
+                if id(item) not in failed_ids:
+                    self.pipeline.advance(self, item)
+            if failed:
+                self._retry(failed)
+        finally:
+            if not taken:
+                self._finish(len(items))
+
+    def _retry(self, items):
+        if self._stopped.is_set():
+            logger.warning(
+                f"Stage {self.name} is stopping, leaving {len(items)} failed items."
+            )
+            return
+        for item in items:
+            attempts = item.setdefault("_attempts", {})
+            attempts[self.name] = attempts.get(self.name, 0) + 1
+            if self.retry.exhausted(attempts[self.name]):
+                with self._idle:
+                    self.metrics["exhausted"] += 1
+                self.pipeline.exhaust(self, item)
+                continue
+            with self._idle:
+                self.metrics["retried"] += 1
+                self._pending += 1
+                self._retry_pending += 1
+            self.pipeline.scheduler.schedule(
+                self.retry.delay(attempts[self.name]),
+                lambda item=item: self._requeue(item),
+            )
+
+    def _requeue(self, item):
+        if self._stopped.is_set():
+            with self._idle:
+                self._retry_pending -= 1
+            self._finish(1)
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Keep the timer thread free; try again once the stage has room
+            self.pipeline.scheduler.schedule(
+                POLL_INTERVAL, lambda: self._requeue(item)
+            )
+            return
+        with self._idle:
+            self._retry_pending -= 1
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._work, name=f"{self.name}-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def wait_idle(self, timeout):
+        """Waits until nothing is queued or in progress; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout):
+        self._stopped.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._idle:
+            batches = self.metrics["batches"]
+            return {
+                **self.metrics,
+                "depth": self.queue.qsize(),
+                "pending": self._pending,
+                "retry_pending": self._retry_pending,
+                "concurrency": self.concurrency,
+                "latency_avg": (
+                    round(self.metrics["latency_seconds"] / batches, 3)
+                    if batches
+                    else 0.0
+                ),
+                "latency_max": round(self.latency_max, 3),
+            }
+
+
+class Pipeline:
+    """
+    Wires stages together by name and tracks each submitted item across
+    fan-out, calling on_complete(item) once every stage it reached is done
+    with it. A stage that runs out of retries calls on_exhausted(stage_name,
+    item) and its branch counts as done. Items abandoned at shutdown never
+    complete. on_batch(stage_name, size, failed, elapsed) is called after
+    every batch, e.g. to feed latency histograms.
+
+    On fan-out every downstream stage gets its own fork(item) (a shallow copy
+    by default), so parallel branches never mutate the same object, and
+    join(item, branch) folds each branch back into the submitted item when
+    the branch leaves the pipeline.
+    """
+
+    def __init__(
+        self,
+        stages,
+        on_complete=None,
+        on_exhausted=None,
+        on_batch=None,
+        fork=copy.copy,
+        join=None,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        self.entry = stages[0]
+        self.on_complete = on_complete
+        self.on_exhausted = on_exhausted
+        self.on_batch = on_batch
+        self.fork = fork
+        self.join = join
+        self.scheduler = RetryScheduler()
+        self._inflight = {}
+        # id(branch) -> (branch, id(submitted item)) for fan-out copies
+        self._branches = {}
+        self._lock = threading.Lock()
+        for stage in stages:
+            stage.pipeline = self
+            for name in stage.downstream:
+                if name not in self.stages:
+                    raise ValueError(f"Stage {stage.name} feeds unknown stage {name}")
+
+    def submit(self, item, drop_oldest=False):
+        """
+        Hands an item to the first stage, blocking while it is full unless
+        drop_oldest is set. Returns the item dropped to make room, if any.
+        """
+        dropped = None
+        if drop_oldest and self.entry.queue.full():
+            dropped = self.entry.drop_oldest()
+            if dropped is not None:
+                with self._lock:
+                    self._inflight.pop(id(dropped), None)
+        with self._lock:
+            self._inflight[id(item)] = [item, 1]
+        self.entry.put(item)
+        return dropped
+
+    def exhaust(self, stage, item):
+        """
+        Called by a stage for every item it gave up on. The branch counts as
+        done even if on_exhausted raises, so the item is not held forever.
+        """
+        if self.on_exhausted:
+            try:
+                self.on_exhausted(stage.name, item)
+            except Exception as e:
+                logger.error(f"Could not dead-letter an item from {stage.name}: {e}")
+        self.advance(stage, item, forward=False)
+
+    def resume(self, stage_name, item, processed):
+        """
+        Re-enters an item from an earlier run: forwarded as if `stage_name`
+        had just processed it, or queued on that stage otherwise.
+        """
+        stage = self.stages[stage_name]
+        with self._lock:
+            self._inflight[id(item)] = [item, 1]
+        if processed:
+            self.advance(stage, item)
+        else:
+            stage.put(item)
+
+    def advance(self, stage, item, forward=True):
+        """Called by a stage for every item it finished successfully."""
+        targets = []
+        if forward and stage.forward(item):
+            targets = [self.stages[name] for name in stage.downstream]
+        fan_out = len(targets) > 1
+        branches = [self.fork(item) for _ in targets] if fan_out else [item] * len(targets)
+        with self._lock:
+            root_id = self._branches.get(id(item), (None, id(item)))[1]
+            entry = self._inflight.get(root_id)
+            if entry is None:
+                return
+            root = entry[0]
+            if len(targets) != 1 and item is not root:
+                # This branch ends here, in new branches or out of the pipeline
+                del self._branches[id(item)]
+                if self.join:
+                    try:
+                        self.join(root, item)
+                    except Exception as e:
+                        logger.error(f"join failed after stage {stage.name}: {e}")
+            if fan_out:
+                for branch in branches:
+                    self._branches[id(branch)] = (branch, root_id)
+            entry[1] += len(targets) - 1
+            complete = entry[1] == 0
+            if complete:
+                del self._inflight[root_id]
+        for target, branch in zip(targets, branches):
+            target.put(branch)
+        if complete and self.on_complete:
+            try:
+                self.on_complete(root)
+            except Exception as e:
+                logger.error(f"on_complete failed after stage {stage.name}: {e}")
+
+    def start(self):
+        self.scheduler.start()
+        for stage in self.stages.values():
+            stage.start()
+
+    def drain(self, timeout):
+        """
+        Stops the stages in order, giving each whatever is left of `timeout`
+        to finish its queued and in-progress items first.
+        """
+        deadline = time.monotonic() + timeout
+        for stage in self.stages.values():
+            if not stage.wait_idle(max(0.0, deadline - time.monotonic())):
+                logger.warning(f"Stage {stage.name} did not drain before the timeout.")
+            stage.stop(max(0.0, deadline - time.monotonic()))
+        self.scheduler.stop()
+
+    def stats(self):
+        return {
+            **{name: stage.stats() for name, stage in self.stages.items()},
+            "retry_queue_depth": len(self.scheduler),
+        }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._inflight)
@@ -0,0 +1,118 @@
+import json
+import re
+import threading
+from collections import Counter
+
+# Deterministic rejections for criteria in the evaluation prompt. Each rule
+# matches a case-insensitive regex against one job field; a match is ignored
+# when the sentence around it matches the optional "unless" regex. A JSON
+# file of the same shape can replace these via CONSUMER_PREFILTER_RULES.
+#
+# Rejections are final (the job is acked and never stored), so the rules
+# only catch explicit requirements and leave anything ambiguous to the LLM.
+YEARS = r"(?:[4-9]|1\d|20)(?:\s*(?:-|–|to)\s*\d+)?\s*\+?\s*(?:or\s+more\s+)?years?\s+(?:of\s+)?(?:[\w-]+\s+){0,3}experience"
+DEFAULT_RULES = [
+    {
+        "name": "senior_title",
+        "field": "title",
+        "pattern": (
+            r"\b(senior|sr\.?|principal|director|head of|vp|vice president)\b"
+            # "Member of Technical Staff" and "Staff Accountant" are not senior
+            r"|\bstaff\s+([\w-]+\s+)?(engineer|developer|scientist|architect)\b"
+            r"|\b(engineering|software|development)\s+manager\b"
+            r"|\b(tech(nical)?|team)\s+lead\b"
+        ),
+        "reason": "Title indicates a senior/management role",
+    },
+    {
+        "name": "phd_required",
+        "field": "description",
+        "pattern": r"\bph\.?\s?d\.?\s+(is\s+)?required\b|\brequires?\s+an?\s+ph\.?\s?d\b",
+        "reason": "Requires a PhD",
+    },
+    {
+        "name": "top_secret_clearance",
+        "field": "description",
+        "pattern": r"\bts\s*/\s*sci\b|\btop\s+secret\b",
+        "unless": (
+            r"prefer|ideal|bonus|nice\s+to\s+have|\bplus\b"
+            r"|\b(ability|able)\s+to\s+obtain|eligib|\bno\b|\bnot\b|n't\b"
+        ),
+        "reason": "Requires TOP SECRET clearance",
+    },
+    {
+        "name": "min_experience",
+        "field": "description",
+        # The lower bound of a range is what counts, so the number must come
+        # right after the requirement cue, or must not end an "X to Y" range.
+        "pattern": (
+            r"\b(?:at\s+least|minimum(?:\s+of)?|requires?|required:?|must\s+have)\s+" + YEARS
+            + r"|(?<![\w\-–])(?<!to\s)" + YEARS + r"\s+(?:is\s+)?required"
+        ),
+        "unless": (
+            r"prefer|ideal|bonus|nice\s+to\s+have|\bplus\b"
+            r"|\bor\b.*\b(master|ms\b|m\.s|ph\.?\s?d|graduate)"
+        ),
+        "reason": "Requires 4 or more years of experience",
+    },
+]
+SENTENCE_END = re.compile(r"\n|[.;!?](?=\s)")
+
+
+def load_rules(path=None):
+    rules = DEFAULT_RULES
+    if path:
+        with open(path, "r") as f:
+            rules = json.load(f)
+    return rules
+
+
+def sentence_around(text, start, end):
+    begin = 0
+    for match in SENTENCE_END.finditer(text, 0, start):
+        begin = match.end()
+    match = SENTENCE_END.search(text, end)
+    return text[begin : match.start() if match else len(text)]
+
+
+class Prefilter:
+    """
+    Checks jobs against the rejection rules and counts hits per rule.
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            {
+                **rule,
+                "regex": re.compile(rule["pattern"], re.IGNORECASE),
+                "unless_regex": (
+                    re.compile(rule["unless"], re.IGNORECASE) if rule.get("unless") else None
+                ),
+            }
+            for rule in rules
+        ]
+        self.hits = Counter()
+        self._lock = threading.Lock()
+
+    def _matches(self, rule, text):
+        for match in rule["regex"].finditer(text):
+            unless = rule["unless_regex"]
+            if unless is None or not unless.search(
+                sentence_around(text, match.start(), match.end())
+            ):
+                return True
+        return False
+
+    def check(self, job):
+        """
+        Returns the first rule the job trips, or None if it should go to the LLM.
+        """
+        for rule in self.rules:
+            if self._matches(rule, job.get(rule["field"]) or ""):
+                with self._lock:
+                    self.hits["checked"] += 1
+                    self.hits[rule["name"]] += 1
+                return rule
+        with self._lock:
+            self.hits["checked"] += 1
+        return None
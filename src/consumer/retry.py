@@ -0,0 +1,96 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits a random time up to
+    base_delay * 2**(n - 1), capped at max_delay. Jobs that have failed
+    max_attempts times are exhausted.
+    """
+
+    def __init__(self, max_attempts=6, base_delay=2, max_delay=120):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def exhausted(self, attempt):
+        return attempt >= self.max_attempts
+
+
+class RetryScheduler:
+    """
+    Timer heap serviced by one thread, so jobs waiting for a retry do not
+    hold a worker. schedule(delay, callback) runs callback once the delay has
+    passed; a callback that raises is logged and dropped.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def schedule(self, delay, callback):
+        with self._wakeup:
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._sequence), callback)
+            )
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._stopped:
+                    if self._heap:
+                        remaining = self._heap[0][0] - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._wakeup.wait(remaining)
+                    else:
+                        self._wakeup.wait()
+                if self._stopped:
+                    return
+                _, _, callback = heapq.heappop(self._heap)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Scheduled retry failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="retry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+
+    def __len__(self):
+        with self._wakeup:
+            return len(self._heap)
+
+
+class DeadLetterSpool:
+    """Appends dead-lettered jobs to a local JSON Lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
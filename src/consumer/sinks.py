@@ -0,0 +1,109 @@
+import random
+import time
+
+DYNAMODB_MAX_BATCH = 25
+SNS_MAX_BATCH = 10
+SNS_MAX_PAYLOAD_BYTES = 256 * 1024
+
+
+class DynamoDBBatchWriter:
+    """
+    Writes items with BatchWriteItem in chunks of up to 25, retrying
+    UnprocessedItems with jittered exponential backoff.
+    """
+
+    def __init__(self, client, table_name, max_retries=5, base_delay=0.1):
+        self.client = client
+        self.table_name = table_name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    def write(self, items):
+        """
+        Returns the items still unprocessed after all retries.
+        """
+        unprocessed = []
+        for start in range(0, len(items), DYNAMODB_MAX_BATCH):
+            unprocessed += self._write_chunk(items[start : start + DYNAMODB_MAX_BATCH])
+        return unprocessed
+
+    def _write_chunk(self, items):
+        requests = [{"PutRequest": {"Item": item}} for item in items]
+        for attempt in range(self.max_retries + 1):
+            response = self.client.batch_write_item(
+                RequestItems={self.table_name: requests}
+            )
+            requests = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            if not requests:
+                return []
+            if attempt < self.max_retries:
+                delay = self.base_delay * 2**attempt
+                time.sleep(random.uniform(delay / 2, delay))
+        return [request["PutRequest"]["Item"] for request in requests]
+
+
+class SNSBatchPublisher:
+    """
+    Publishes messages with PublishBatch in chunks of up to 10 entries and
+    256 KB total, retrying entries SNS reports as failed through no fault of
+    the sender with jittered exponential backoff.
+    """
+
+    def __init__(self, client, topic_arn, max_retries=5, base_delay=0.1):
+        self.client = client
+        self.topic_arn = topic_arn
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    def _chunks(self, messages):
+        chunk, size = [], 0
+        for key, message in messages:
+            message_size = len(message.encode())
+            full = len(chunk) == SNS_MAX_BATCH
+            if chunk and (full or size + message_size > SNS_MAX_PAYLOAD_BYTES):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((key, message))
+            size += message_size
+        if chunk:
+            yield chunk
+
+    def publish(self, messages):
+        """
+        Takes (key, message) pairs and returns (failed, rejected) keys: failed
+        entries ran out of retries, rejected ones were refused as the sender's
+        fault and will not succeed on retry.
+        """
+        failed, rejected = [], []
+        for chunk in self._chunks(messages):
+            chunk_failed, chunk_rejected = self._publish_chunk(chunk)
+            failed += chunk_failed
+            rejected += chunk_rejected
+        return failed, rejected
+
+    def _publish_chunk(self, chunk):
+        pending = {
+            f"m{index}": (key, message) for index, (key, message) in enumerate(chunk)
+        }
+        rejected = []
+        for attempt in range(self.max_retries + 1):
+            response = self.client.publish_batch(
+                TopicArn=self.topic_arn,
+                PublishBatchRequestEntries=[
+                    {"Id": entry_id, "Message": message}
+                    for entry_id, (_, message) in pending.items()
+                ],
+            )
+            retry = {}
+            for failure in response.get("Failed", []):
+                if failure.get("SenderFault"):
+                    rejected.append(pending[failure["Id"]][0])
+                else:
+                    retry[failure["Id"]] = pending[failure["Id"]]
+            pending = retry
+            if not pending:
+                return [], rejected
+            if attempt < self.max_retries:
+                delay = self.base_delay * 2**attempt
+                time.sleep(random.uniform(delay / 2, delay))
+        return [key for key, _ in pending.values()], rejected
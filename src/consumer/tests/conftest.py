@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The consumer runs as a flat directory of modules (python consumer.py).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+from acks import AckTracker
+
+
+class Channel:
+    def __init__(self):
+        self.calls = []
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def basic_ack(self, delivery_tag):
+        self.calls.append(("ack", delivery_tag))
+
+    def basic_nack(self, delivery_tag, requeue):
+        self.calls.append(("nack", delivery_tag, requeue))
+
+
+def test_requeued_delivery_is_not_acked_later():
+    channel = Channel()
+    acks = AckTracker()
+    acks.bind(channel, channel)
+    acks.track(1)
+    acks.track(2)
+
+    acks.requeue(1)
+    acks.done(1)
+    acks.done(2)
+    acks.done(None)
+
+    assert channel.calls == [("nack", 1, True), ("ack", 2)]
+    assert len(acks) == 0
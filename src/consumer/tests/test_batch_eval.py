@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from openai import OpenAI
+
+from batch_eval import BatchEvaluator
+from bench import FakeOpenAI
+from pipeline import Pipeline, Stage
+from retry import RetryPolicy
+
+JOBS = 10
+THRESHOLD = 5
+MAX_JOBS = 8
+
+
+@pytest.fixture
+def server():
+    fake = FakeOpenAI(0.0, 0.0, 0.0, 0.5, batch_latency=0.2)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    yield fake
+    fake.shutdown()
+    fake.server_close()
+
+
+def client(server):
+    return OpenAI(
+        api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0
+    )
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def request_body(job):
+    return {"model": "test", "messages": [{"role": "user", "content": job["id"]}]}
+
+
+def apply_result(job, content):
+    job["evaluation"] = {**json.loads(content), "via": "batch"}
+
+
+class Harness:
+    """An evaluation stage feeding a sink, with the evaluator on the first."""
+
+    def __init__(self, server, workdir, sink_gate=None):
+        self.completed = []
+        self.sink_gate = sink_gate or threading.Event()
+        if sink_gate is None:
+            self.sink_gate.set()
+
+        def evaluate(jobs):
+            for job in jobs:
+                job["evaluation"] = {"via": "realtime"}
+            return []
+
+        def sink(jobs):
+            self.sink_gate.wait()
+            return []
+
+        def on_complete(job):
+            self.completed.append(job)
+            self.evaluator.finished(job)
+
+        retry = RetryPolicy(max_attempts=1)
+        self.pipeline = Pipeline(
+            [
+                Stage("openai", evaluate, retry=retry, downstream=["sink"]),
+                Stage("sink", sink, retry=retry),
+            ],
+            on_complete=on_complete,
+        )
+        self.evaluator = BatchEvaluator(
+            client(server),
+            self.pipeline,
+            "openai",
+            request_body,
+            apply_result,
+            threshold=THRESHOLD,
+            max_jobs=MAX_JOBS,
+            poll_interval=0.05,
+            workdir=str(workdir),
+        )
+
+    def manifests(self):
+        return [name for name in os.listdir(self.evaluator.workdir) if name.endswith(".json")]
+
+
+def submit_backlog(harness):
+    """Queues JOBS jobs before any worker runs and lets the evaluator take some."""
+    for index in range(JOBS):
+        harness.pipeline.submit({"id": f"{index}_test"})
+    harness.evaluator.start()
+    wait_for(lambda: harness.evaluator.stats().get("jobs_submitted") == MAX_JOBS)
+    harness.pipeline.start()
+
+
+def test_manifest_is_kept_until_batched_jobs_complete(server, tmp_path):
+    gate = threading.Event()
+    harness = Harness(server, tmp_path, sink_gate=gate)
+    submit_backlog(harness)
+
+    wait_for(lambda: harness.evaluator.stats().get("jobs_completed") == MAX_JOBS)
+    # Results are in, but the jobs are still held up in the sink
+    assert len(harness.manifests()) == 1
+    gate.set()
+    wait_for(lambda: len(harness.pipeline) == 0)
+    harness.evaluator.stop()
+    harness.pipeline.drain(2)
+
+    via = [job["evaluation"]["via"] for job in harness.completed]
+    assert via.count("batch") == MAX_JOBS
+    assert via.count("realtime") == JOBS - MAX_JOBS
+    assert harness.manifests() == []
+
+
+def test_drain_does_not_wait_for_a_pending_batch(server, tmp_path):
+    server.batch_latency = 60
+    harness = Harness(server, tmp_path)
+    submit_backlog(harness)
+
+    harness.evaluator.stop()
+    started = time.monotonic()
+    harness.pipeline.drain(5)
+    assert time.monotonic() - started < 1
+    assert harness.pipeline.stages["openai"].stats()["pending"] == 0
+    assert len(harness.completed) == JOBS - MAX_JOBS
+    assert len(harness.manifests()) == 1
+
+    # A restarted consumer picks the batch up from its manifest
+    for batch in server.batches.values():
+        batch["_done_at"] = 0
+    restarted = Harness(server, tmp_path)
+    restarted.pipeline.start()
+    restarted.evaluator.start()
+    wait_for(lambda: len(restarted.completed) == MAX_JOBS)
+    wait_for(lambda: restarted.manifests() == [])
+    restarted.evaluator.stop()
+    restarted.pipeline.drain(2)
+    assert {job["evaluation"]["via"] for job in restarted.completed} == {"batch"}
@@ -0,0 +1,55 @@
+from compaction import DescriptionCompactor
+
+
+def compact(text):
+    return DescriptionCompactor(token_budget=1500).compact(text)
+
+
+def test_short_bullets_do_not_start_a_boilerplate_skip():
+    text = "\n".join(
+        [
+            "Responsibilities",
+            "Privacy engineering",
+            "Build data deletion pipelines for user accounts",
+            "Legal hold tooling",
+            "Review access control changes with security teams",
+        ]
+    )
+    assert compact(text) == text
+
+
+def test_drops_boilerplate_sections_with_or_without_colons():
+    text = "\n".join(
+        [
+            "About Us",
+            "We make software for hospitals around the world.",
+            "Responsibilities:",
+            "Ship backend services in Go.",
+            "Benefits",
+            "Free lunch and a gym membership.",
+            "Qualifications",
+            "Bachelor's degree in computer science.",
+            "Equal Opportunity Employer:",
+            "We celebrate diversity in our workplace.",
+        ]
+    )
+    assert compact(text).splitlines() == [
+        "Responsibilities:",
+        "Ship backend services in Go.",
+        "Qualifications",
+        "Bachelor's degree in computer science.",
+    ]
+
+
+def test_skill_words_on_their_own_line_are_content():
+    text = "\n".join(
+        [
+            "Qualifications",
+            "Bachelor's degree in computer science.",
+            "Privacy",
+            "Familiarity with GDPR and data retention rules.",
+            "Legal",
+            "Experience drafting technical controls for audits.",
+        ]
+    )
+    assert compact(text) == text
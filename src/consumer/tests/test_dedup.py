@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from compaction import DescriptionCompactor
+from dedup import NearDuplicateIndex
+
+WORDS = (
+    "design build operate services pipelines storage queues caches clients "
+    "latency throughput reliability rollout review debug profile migrate "
+    "python go java rust kubernetes terraform kafka postgres redis grpc"
+).split()
+BLURB_WORDS = (
+    "we our team people world offices cities care craft health coverage family "
+    "leave parental stipend learning community values mission culture wellness "
+    "equal opportunity employer diverse workforce applicants race religion"
+).split()
+
+
+def blurb(rng, sentences):
+    return "\n".join(
+        " ".join(rng.choice(BLURB_WORDS) for _ in range(10)) + "." for _ in range(sentences)
+    )
+
+
+# About 400 words shared by every posting of the company
+_rng = random.Random(0)
+BOILERPLATE = "\n".join(
+    ["About Us", blurb(_rng, 14), "Benefits", blurb(_rng, 13), "Equal Opportunity", blurb(_rng, 13)]
+)
+
+
+def role(rng):
+    duties = "\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(10)) + "." for _ in range(3)
+    )
+    return (
+        f"Responsibilities\n{duties}\n"
+        f"Qualifications\nBachelor's degree and {rng.randint(0, 3)} years of experience.\n"
+        f"{BOILERPLATE}"
+    )
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(window=3600, threshold=0.8)
+
+
+def test_flags_lightly_edited_copies(index):
+    text = role(random.Random(1))
+    assert index.check_and_add("1_linkedin", "Software Engineer\n" + text) is None
+    edited = text.replace("Responsibilities", "What you will do")
+    assert index.check_and_add("1_microsoft", "Software Engineer\n" + edited) == "1_linkedin"
+
+
+def test_flags_identical_reposts_under_a_new_id(index):
+    text = "Software Engineer\n" + role(random.Random(2))
+    assert index.check_and_add("1_apple", text) is None
+    assert index.check_and_add("2_apple", text) == "1_apple"
+    # A redelivery of the same job is not its own duplicate
+    assert index.check_and_add("1_apple", text) is None
+
+
+def test_distinct_roles_sharing_boilerplate_are_not_duplicates_once_compacted(index):
+    rng = random.Random(3)
+    compactor = DescriptionCompactor(token_budget=1500)
+    flagged = [
+        job_id
+        for job_id in range(300)
+        if index.check_and_add(
+            f"{job_id}_test", "Software Engineer\n" + compactor.compact(role(rng))
+        )
+        is not None
+    ]
+    assert flagged == []
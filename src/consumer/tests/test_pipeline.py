@@ -0,0 +1,90 @@
+import threading
+import time
+
+from pipeline import Pipeline, Stage
+from retry import RetryPolicy
+
+
+def no_retry():
+    return RetryPolicy(max_attempts=1)
+
+
+def test_raising_on_complete_does_not_stall_drain():
+    def on_complete(item):
+        raise RuntimeError("connection closed")
+
+    pipeline = Pipeline(
+        [Stage("only", lambda items: [], retry=no_retry())], on_complete=on_complete
+    )
+    pipeline.start()
+    for index in range(5):
+        pipeline.submit({"id": index})
+    started = time.monotonic()
+    pipeline.drain(2)
+    assert time.monotonic() - started < 1
+    assert pipeline.stages["only"].stats()["pending"] == 0
+    assert len(pipeline) == 0
+
+
+def test_fan_out_gives_each_branch_its_own_copy():
+    seen = {"left": [], "right": []}
+    completed = []
+    lock = threading.Lock()
+
+    def branch(name):
+        def handler(items):
+            for item in items:
+                item["trace"][name] = True
+                with lock:
+                    seen[name].append(item)
+            return []
+
+        return handler
+
+    def fork(item):
+        return {**item, "trace": dict(item["trace"])}
+
+    def join(item, branch_item):
+        item["trace"].update(branch_item["trace"])
+
+    pipeline = Pipeline(
+        [
+            Stage("entry", lambda items: [], downstream=["left", "right"]),
+            Stage("left", branch("left")),
+            Stage("right", branch("right")),
+        ],
+        on_complete=completed.append,
+        fork=fork,
+        join=join,
+    )
+    pipeline.start()
+    job = {"id": 1, "trace": {}}
+    pipeline.submit(job)
+    pipeline.drain(2)
+
+    left, right = seen["left"][0], seen["right"][0]
+    assert left is not right and left is not job and right is not job
+    assert left["trace"] == {"left": True} and right["trace"] == {"right": True}
+    assert completed == [job]
+    assert job["trace"] == {"left": True, "right": True}
+    assert len(pipeline) == 0
+
+
+def test_item_completes_when_dead_lettering_fails():
+    completed = []
+
+    def on_exhausted(stage_name, item):
+        raise OSError("spool not writable")
+
+    pipeline = Pipeline(
+        [Stage("only", lambda items: items, retry=no_retry())],
+        on_complete=completed.append,
+        on_exhausted=on_exhausted,
+    )
+    pipeline.start()
+    job = {"id": 1}
+    pipeline.submit(job)
+    pipeline.drain(2)
+
+    assert completed == [job]
+    assert len(pipeline) == 0
@@ -0,0 +1,113 @@
+import pytest
+
+from prefilter import DEFAULT_RULES, Prefilter
+
+
+@pytest.fixture
+def prefilter():
+    return Prefilter(DEFAULT_RULES)
+
+
+def job(title="Software Engineer", description=""):
+    return {"id": "1_test", "title": title, "description": description}
+
+
+@pytest.mark.parametrize(
+    "title",
+    [
+        "Senior Software Engineer",
+        "Sr. Backend Engineer",
+        "Staff Engineer, Infrastructure",
+        "Staff Software Engineer",
+        "Principal Engineer",
+        "Software Engineering Manager",
+        "Tech Lead, Payments",
+    ],
+)
+def test_rejects_senior_titles(prefilter, title):
+    assert prefilter.check(job(title=title))["name"] == "senior_title"
+
+
+@pytest.mark.parametrize(
+    "title",
+    [
+        "Software Engineer, Ads Manager",
+        "Software Engineer, Lead Generation Platform",
+        "Backend Engineer - Identity and Access Manager",
+        "Software Engineer II",
+        "Member of Technical Staff",
+        "Staff Accountant Intern",
+    ],
+)
+def test_keeps_titles_that_only_mention_manager_or_lead(prefilter, title):
+    assert prefilter.check(job(title=title)) is None
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "Minimum 5 years of experience in backend development.",
+        "Requires at least 4+ years of professional software experience.",
+        "Must have 6 years of experience with distributed systems.",
+        "Minimum qualifications: at least 4 years of experience.",
+        "8+ years of industry experience required.",
+        "Minimum of 4-6 years of experience.",
+    ],
+)
+def test_rejects_explicit_experience_requirements(prefilter, description):
+    assert prefilter.check(job(description=description))["name"] == "min_experience"
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "2 to 5 years of experience required.",
+        "Requires 2-5 years of experience.",
+        "With over 50 years of experience serving customers, we are a leader.",
+        "Preferred: 5 years of experience with Kubernetes.",
+        "Preferred qualifications: at least 5 years of experience in Go.",
+        "BS with 4 years of experience, or MS with 2 years.",
+        "Requires a BS with 4 years of experience, or an M.S. with 2 years of experience.",
+        "Minimum 4 years of experience, or 2 years with a Master's degree.",
+        "For at least 50 years our customers have trusted us.",
+        "5 years of experience is a plus.",
+        "Bachelor's degree and 2 years of experience.",
+    ],
+)
+def test_keeps_ranges_preferences_and_company_tenure(prefilter, description):
+    assert prefilter.check(job(description=description)) is None
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "Active TS/SCI clearance required.",
+        "Must hold a current Top Secret clearance.",
+    ],
+)
+def test_rejects_required_clearance(prefilter, description):
+    assert prefilter.check(job(description=description))["name"] == "top_secret_clearance"
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        "TS/SCI preferred.",
+        "Ability to obtain a Top Secret clearance is a plus.",
+        "Must be eligible for a Top Secret clearance.",
+        "No security clearance required; this is not a Top Secret role.",
+    ],
+)
+def test_keeps_optional_or_negated_clearance(prefilter, description):
+    assert prefilter.check(job(description=description)) is None
+
+
+def test_other_rules_and_hit_counts(prefilter):
+    assert prefilter.check(job(description="PhD required."))["name"] == "phd_required"
+    assert prefilter.check(job(description="Active TS/SCI."))["name"] == "top_secret_clearance"
+    assert prefilter.check(job()) is None
+    assert prefilter.hits == {
+        "checked": 3,
+        "phd_required": 1,
+        "top_secret_clearance": 1,
+    }
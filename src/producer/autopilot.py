@@ -2,14 +2,20 @@ import asyncio
 
 import time
 import logging
-from selenium_driverless import webdriver
 
+from src.producer import metrics
+from src.producer.browser_pool import BrowserPool
+from src.producer.scheduler import Scheduler
 from src.producer.crawlers.ibm import get_job_links as ibm
+from src.producer.crawlers.ibm import get_job_links_fast as ibm_fast
 from src.producer.crawlers.oracle import get_job_links as oracle
+from src.producer.crawlers.oracle import get_job_links_fast as oracle_fast
 from src.producer.crawlers.linkedin import get_job_links as linkedin
 from src.producer.crawlers.microsoft import get_job_links as microsoft
+from src.producer.crawlers.microsoft import get_job_links_fast as microsoft_fast
 from src.producer.crawlers.apple import get_job_links as apple
-import random
+from src.producer.crawlers.apple import get_job_links_fast as apple_fast
+from src.producer.crawlers.http_client import close_session
 from dotenv import load_dotenv
 import os
 
@@ -19,50 +25,86 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-async def run_crawler(crawler, interval_range, queue: asyncio.Queue, semaphore):
-    async with semaphore:
-        try:
-            options = webdriver.ChromeOptions()
-            options.add_argument("--force-device-scale-factor=0.4")
-            options.add_argument("--high-dpi-support=0.4")
-            async with webdriver.Chrome(options=options) as driver:
-                await driver.minimize_window()
-                result = await crawler(driver)
-                logger.info(
-                    f"{crawler.__module__.split('.')[-1].capitalize()} returned: {result} at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())}"
-                )
-        except Exception as e:
-            logger.error(f"Task {crawler.__name__} failed with error: {e}")
-        finally:
-            next_run = time.time() + random.randint(*interval_range)
-            await queue.put((next_run, crawler, interval_range))
+FAST_PATHS = {
+    oracle: oracle_fast,
+    microsoft: microsoft_fast,
+    apple: apple_fast,
+    ibm: ibm_fast,
+}
 
 
-async def schedule_crawlers(queue: asyncio.Queue, semaphore):
-    while True:
-        if not queue.empty():
-            next_run, crawler, interval_range = await queue.get()
-            now = time.time()
-            if next_run <= now:
-                asyncio.create_task(
-                    run_crawler(crawler, interval_range, queue, semaphore)
+async def run_crawler(
+    crawler,
+    interval_range,
+    planned,
+    scheduler: Scheduler,
+    pool: BrowserPool,
+    fast_paths,
+):
+    name = crawler.__module__.split(".")[-1]
+    started = None
+    result = None
+    path = "fast"
+    try:
+        fast_path = fast_paths.get(crawler)
+        if fast_path is not None:
+            started = time.time()
+            scheduler.record_start(name, planned, started, interval_range)
+            try:
+                result = await fast_path()
+            except Exception as e:
+                logger.warning(
+                    f"{name.capitalize()} fast path failed, falling back to Selenium: {e}"
                 )
-            else:
-                await queue.put((next_run, crawler, interval_range))
-                sleep_time = min(next_run - now, 1)
-                await asyncio.sleep(sleep_time)
-        else:
-            await asyncio.sleep(1)
+                metrics.FAST_PATH_FALLBACKS.labels(name).inc()
+        if result is None:
+            path = "browser"
+            async with pool.lease() as driver:
+                if started is None:
+                    started = time.time()
+                    scheduler.record_start(name, planned, started, interval_range)
+                result = await crawler(driver)
+        logger.info(
+            f"{name.capitalize()} returned: {result} at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())}"
+        )
+    except Exception as e:
+        logger.error(f"Task {crawler.__name__} failed with error: {e}")
+    finally:
+        new_jobs = result.new if result else 0
+        if started is not None:
+            duration = time.time() - started
+            scheduler.record_end(name, duration, new_jobs)
+            metrics.CRAWLER_RUN_DURATION.labels(name, path).observe(duration)
+            metrics.CRAWLER_SCHEDULE_LAG.labels(name).observe(max(0.0, started - planned))
+        metrics.CRAWLER_RUNS.labels(name, "success" if result else "error").inc()
+        if result:
+            metrics.CRAWLER_FOUND_JOBS.labels(name).inc(result.found)
+            metrics.CRAWLER_NEW_JOBS.labels(name).inc(result.new)
+        logger.info(f"Browser pool lease stats: {pool.stats()}")
+        if name in scheduler.stats:
+            logger.info(f"{name.capitalize()} schedule stats: {scheduler.stats[name].as_dict()}")
+        next_run = time.time() + scheduler.next_delay(name, interval_range, new_jobs)
+        scheduler.schedule(next_run, crawler, interval_range)
 
 
-async def autopilot(crawlers_with_intervals, num_instances=5):
-    queue = asyncio.Queue()
+async def autopilot(
+    crawlers_with_intervals, num_instances=5, adaptive_bounds=None, fast_paths=None
+):
+    scheduler = Scheduler(adaptive_bounds)
     current_time = time.time()
     for crawler, interval_range in crawlers_with_intervals:
-        await queue.put((current_time, crawler, interval_range))
+        scheduler.schedule(current_time, crawler, interval_range)
 
-    semaphore = asyncio.Semaphore(num_instances)
-    await schedule_crawlers(queue, semaphore)
+    pool = BrowserPool(num_instances)
+    try:
+        await scheduler.run(
+            lambda crawler, interval_range, planned: run_crawler(
+                crawler, interval_range, planned, scheduler, pool, fast_paths or {}
+            )
+        )
+    finally:
+        await pool.close()
+        await close_session()
 
 
 async def main():
@@ -74,7 +116,20 @@ async def main():
         (ibm, (240, 300)),
     ]
     num_instances = int(os.getenv("PRODUCER_CONCURRENT_DRIVERS", 5))
-    await autopilot(crawlers_with_intervals, num_instances)
+    adaptive_bounds = None
+    if os.getenv("PRODUCER_ADAPTIVE_INTERVALS", "false").lower() == "true":
+        adaptive_bounds = (
+            float(os.getenv("PRODUCER_ADAPTIVE_MIN_FACTOR", 0.5)),
+            float(os.getenv("PRODUCER_ADAPTIVE_MAX_FACTOR", 3)),
+        )
+    fast_paths = None
+    if os.getenv("PRODUCER_FAST_PATH", "false").lower() == "true":
+        fast_paths = FAST_PATHS
+    metrics_port = int(os.getenv("PRODUCER_METRICS_PORT", 9101))
+    if metrics_port:
+        metrics.serve(metrics_port)
+        logger.info(f"Serving metrics on port {metrics_port}")
+    await autopilot(crawlers_with_intervals, num_instances, adaptive_bounds, fast_paths)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,475 @@
+"""
+Record/replay benchmark for the browser crawlers.
+
+    python -m src.producer.bench record apple microsoft
+    python -m src.producer.bench replay --runs 3
+
+`record` runs each crawler's get_job_links against the live site and saves
+every document, script, stylesheet and XHR/fetch response it loads to
+bench_fixtures/<crawler>/. `replay` runs the same get_job_links with the
+browser's requests rewritten (CDP Fetch domain) to a local server holding
+those fixtures; anything that was not recorded is failed, so layout changes
+show up as misses instead of live traffic.
+
+In both modes dedup and submit calls go to a local stub Queue API that treats
+every job as new, and the per-domain rate limits are lifted unless --throttle
+is given. Each run reports wall time per phase (cumulative, so concurrent
+description tabs can add up to more than the wall time), CDP calls per job
+and jobs per minute.
+"""
+import argparse
+import asyncio
+import base64
+import contextvars
+import hashlib
+import importlib
+import json
+import logging
+import os
+import socket
+import statistics
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+CRAWLERS = ["apple", "ibm", "indeed", "linkedin", "microsoft", "oracle"]
+FIXTURES_DIR = "bench_fixtures"
+RECORDED_TYPES = {"Document", "Script", "Stylesheet", "XHR", "Fetch"}
+# Headers that no longer describe the body once it was decoded by the browser.
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+# Crawler-level calls timed as phases, where the crawler module uses them.
+PHASES = {
+    "extract_rows": "extract",
+    "extract_text_blocks": "extract",
+    "filter_uncached": "dedup",
+    "add_to_cache": "dedup",
+    "fetch_descriptions": "descriptions",
+    "process_job": "descriptions",
+    "get_job_description": "description_page",
+    "send_job_to_queue": "submit",
+}
+UNTHROTTLED = (1e6, 1e6, 0.0)
+
+logger = logging.getLogger(__name__)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fixture_key(method, url, post_data=None):
+    return hashlib.sha1(f"{method} {url} {post_data or ''}".encode()).hexdigest()
+
+
+class Fixtures:
+    """
+    Recorded responses of one crawler: index.json maps a request key to its
+    URL, status and headers, and the body is stored next to it as <key>.body.
+    """
+
+    def __init__(self, crawler):
+        self.path = os.path.join(FIXTURES_DIR, crawler)
+        self.index = {}
+        index_path = os.path.join(self.path, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                self.index = json.load(f)
+
+    def save(self, key, url, status, headers, body):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, f"{key}.body"), "wb") as f:
+            f.write(body)
+        self.index[key] = {"url": url, "status": status, "headers": headers}
+
+    def flush(self):
+        with open(os.path.join(self.path, "index.json"), "w") as f:
+            json.dump(self.index, f, indent=2)
+
+    def body(self, key):
+        with open(os.path.join(self.path, f"{key}.body"), "rb") as f:
+            return f.read()
+
+
+class StubQueueAPI:
+    """
+    In-memory stand-in for the Queue API. Every key is unseen until the run
+    submits or marks it, like an empty Redis.
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.submitted = []
+        self.requests = Counter()
+
+    def reset(self):
+        self.seen.clear()
+        self.submitted.clear()
+        self.requests.clear()
+
+    async def check(self, request):
+        self.requests["check"] += 1
+        if request.query["key"] in self.seen:
+            return web.json_response({"message": "Key already exists"}, status=409)
+        return web.json_response({"message": "Key does not exist"})
+
+    async def check_batch(self, request):
+        self.requests["check_batch"] += 1
+        keys = (await request.json())["keys"]
+        return web.json_response({"uncached": [k for k in keys if k not in self.seen]})
+
+    async def checked(self, request):
+        self.requests["checked"] += 1
+        self.seen.add((await request.json())["id"])
+        return web.json_response({"message": "Checked successfully"})
+
+    async def submit(self, request):
+        self.requests["submit"] += 1
+        job = await request.json()
+        self.seen.add(job["id"])
+        self.submitted.append(job)
+        return web.json_response({"message": "Success"})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/check", self.check)
+        app.router.add_post("/check/batch", self.check_batch)
+        app.router.add_post("/checked", self.checked)
+        app.router.add_post("/submit", self.submit)
+        return app
+
+
+class FixtureServer:
+    """Serves the current crawler's fixtures at /<key>."""
+
+    def __init__(self):
+        self.fixtures = None
+
+    async def serve(self, request):
+        key = request.match_info["key"]
+        entry = self.fixtures.index.get(key) if self.fixtures else None
+        if entry is None:
+            return web.Response(status=404)
+        headers = {
+            name: value
+            for name, value in entry["headers"].items()
+            if name.lower() not in DROPPED_HEADERS
+        }
+        return web.Response(
+            status=entry["status"], headers=headers, body=self.fixtures.body(key)
+        )
+
+    def app(self):
+        app = web.Application()
+        app.router.add_route("*", "/{key}", self.serve)
+        return app
+
+
+class Phases:
+    """
+    Wall time spent inside each phase. Nested calls of the same phase (e.g.
+    Chrome.get delegating to its target) are only counted once.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self._active = contextvars.ContextVar("phases", default=frozenset())
+
+    def wrap(self, phase, fn):
+        async def timed(*args, **kwargs):
+            active = self._active.get()
+            if phase in active:
+                return await fn(*args, **kwargs)
+            token = self._active.set(active | {phase})
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.perf_counter() - started
+                self.calls[phase] += 1
+                self._active.reset(token)
+
+        return timed
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+
+class Interceptor:
+    """
+    Pauses a tab's requests through the CDP Fetch domain. When recording,
+    responses are paused and their bodies saved; when replaying, requests
+    with a fixture are rewritten to the fixture server and the rest failed.
+    """
+
+    def __init__(self, mode, fixture_port):
+        self.mode = mode
+        self.fixture_port = fixture_port
+        self.fixtures = None
+        self.counters = Counter()
+        self._tasks = set()
+
+    async def attach(self, target):
+        stage = "Response" if self.mode == "record" else "Request"
+        await target.add_cdp_listener(
+            "Fetch.requestPaused", lambda params: self._spawn(target, params)
+        )
+        await target.execute_cdp_cmd(
+            "Fetch.enable", {"patterns": [{"urlPattern": "*", "requestStage": stage}]}
+        )
+
+    def _spawn(self, target, params):
+        handler = self._record if self.mode == "record" else self._replay
+        task = asyncio.ensure_future(handler(target, params))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record(self, target, params):
+        request_id = params["requestId"]
+        request = params["request"]
+        try:
+            status = params.get("responseStatusCode")
+            if params.get("resourceType") in RECORDED_TYPES and status:
+                result = await target.execute_cdp_cmd(
+                    "Fetch.getResponseBody", {"requestId": request_id}
+                )
+                if result.get("base64Encoded"):
+                    body = base64.b64decode(result["body"])
+                else:
+                    body = result["body"].encode()
+                headers = {
+                    header["name"]: header["value"]
+                    for header in params.get("responseHeaders", [])
+                }
+                key = fixture_key(request["method"], request["url"], request.get("postData"))
+                self.fixtures.save(key, request["url"], status, headers, body)
+                self.counters["recorded"] += 1
+            else:
+                self.counters["skipped"] += 1
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Could not record {request['url']}: {e}")
+        await target.execute_cdp_cmd("Fetch.continueRequest", {"requestId": request_id})
+
+    async def _replay(self, target, params):
+        request_id = params["requestId"]
+        request = params["request"]
+        key = fixture_key(request["method"], request["url"], request.get("postData"))
+        if key in self.fixtures.index:
+            self.counters["hits"] += 1
+            await target.execute_cdp_cmd(
+                "Fetch.continueRequest",
+                {"requestId": request_id, "url": f"http://127.0.0.1:{self.fixture_port}/{key}"},
+            )
+            return
+        if params.get("resourceType") in RECORDED_TYPES:
+            self.counters["misses"] += 1
+            logger.info(f"No fixture for {request['method']} {request['url']}")
+        else:
+            self.counters["blocked"] += 1
+        await target.execute_cdp_cmd(
+            "Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"}
+        )
+
+
+class CDPCounter:
+    """
+    Counts CDP commands sent by any target, leaving out the Fetch commands
+    the interceptor issues itself.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def wrap(self, fn):
+        async def counted(target, cmd, *args, **kwargs):
+            if not cmd.startswith("Fetch."):
+                self.calls[cmd] += 1
+            return await fn(target, cmd, *args, **kwargs)
+
+        return counted
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+@asynccontextmanager
+async def serve(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        yield
+    finally:
+        await runner.cleanup()
+
+
+def instrument(module, phases, mode):
+    for name, phase in PHASES.items():
+        if hasattr(module, name):
+            setattr(module, name, phases.wrap(phase, getattr(module, name)))
+    if mode == "replay":
+        # Cookies only matter to the live site; replay must not need them.
+        for name in ("load_cookies", "update_cookies"):
+            if hasattr(module, name):
+                setattr(module, name, _no_cookies)
+
+
+async def _no_cookies(driver, file_address):
+    return None
+
+
+def patch_browser(interceptor, phases, cdp):
+    from selenium_driverless import webdriver
+    from selenium_driverless.types.target import Target
+
+    Target.execute_cdp_cmd = cdp.wrap(Target.execute_cdp_cmd)
+    Target.get = phases.wrap("navigate", Target.get)
+    webdriver.Chrome.get = phases.wrap("navigate", webdriver.Chrome.get)
+    new_window = webdriver.Chrome.new_window
+
+    async def intercepted_window(self, *args, **kwargs):
+        target = await new_window(self, *args, **kwargs)
+        await interceptor.attach(target)
+        return target
+
+    webdriver.Chrome.new_window = intercepted_window
+
+
+async def launch():
+    from selenium_driverless import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--force-device-scale-factor=0.4")
+    options.add_argument("--high-dpi-support=0.4")
+    return await webdriver.Chrome(options=options)
+
+
+async def run_once(name, module, interceptor, queue_api, phases, cdp):
+    from src.producer.crawlers import util
+
+    # The Queue API starts empty, so forget what earlier runs submitted or
+    # every run after the first skips all jobs as already known.
+    util.seen_cache = util.SeenCache()
+    queue_api.reset()
+    phases.reset()
+    cdp.calls.clear()
+    interceptor.counters.clear()
+    driver = await launch()
+    try:
+        await interceptor.attach(driver)
+        started = time.perf_counter()
+        try:
+            result = await module.get_job_links(driver)
+        except Exception as e:
+            logger.error(f"{name} failed: {e}")
+            result = None
+        wall = time.perf_counter() - started
+    finally:
+        await driver.quit()
+    submitted = len(queue_api.submitted)
+    return {
+        "crawler": name,
+        "ok": result is not None,
+        "wall_seconds": round(wall, 2),
+        "found": result.found if result else 0,
+        "new": result.new if result else 0,
+        "submitted": submitted,
+        "jobs_per_minute": round(submitted / wall * 60, 2) if wall else 0.0,
+        "cdp_calls": cdp.total(),
+        "cdp_per_job": round(cdp.total() / submitted, 1) if submitted else None,
+        "phases": {
+            phase: {"seconds": round(seconds, 2), "calls": phases.calls[phase]}
+            for phase, seconds in sorted(phases.seconds.items())
+        },
+        "cdp_top": dict(cdp.calls.most_common(5)),
+        "fixtures": dict(interceptor.counters),
+        "queue_api": dict(queue_api.requests),
+    }
+
+
+def print_report(report):
+    status = "ok" if report["ok"] else "FAILED"
+    print(
+        f'{report["crawler"]:<10} {status:<6} {report["wall_seconds"]:>7}s  '
+        f'found {report["found"]:>3}  submitted {report["submitted"]:>3}  '
+        f'{report["jobs_per_minute"]:>7} jobs/min  '
+        f'{report["cdp_calls"]:>5} CDP calls ({report["cdp_per_job"]}/job)'
+    )
+    for phase, view in report["phases"].items():
+        print(f'    {phase:<17} {view["seconds"]:>7}s over {view["calls"]} calls')
+    print(f'    fixtures {report["fixtures"]}  top CDP {report["cdp_top"]}')
+
+
+async def bench(mode, names, runs, throttle):
+    queue_api = StubQueueAPI()
+    fixture_server = FixtureServer()
+    queue_port, fixture_port = free_port(), free_port()
+    # util reads the Queue API address at import time.
+    os.environ["QUEUE_API_PORT"] = str(queue_port)
+    os.makedirs("logs", exist_ok=True)
+    from src.producer.crawlers import http_client, ratelimit
+    from src.producer.crawlers.watermark import watermarks
+
+    # Every run starts from an empty Queue API, so it must read whole pages
+    # and must not move the live watermarks.
+    watermarks.enabled = False
+    if not throttle:
+        ratelimit.rate_limiter.limits = {}
+        ratelimit.rate_limiter.default = UNTHROTTLED
+
+    phases, cdp = Phases(), CDPCounter()
+    interceptor = Interceptor(mode, fixture_port)
+    patch_browser(interceptor, phases, cdp)
+    reports = defaultdict(list)
+    async with serve(queue_api.app(), queue_port), serve(fixture_server.app(), fixture_port):
+        try:
+            for name in names:
+                module = importlib.import_module(f"src.producer.crawlers.{name}")
+                instrument(module, phases, mode)
+                fixtures = Fixtures(name)
+                if mode == "replay" and not fixtures.index:
+                    print(f"{name:<10} no fixtures in {fixtures.path}, record them first")
+                    continue
+                interceptor.fixtures = fixture_server.fixtures = fixtures
+                for _ in range(1 if mode == "record" else runs):
+                    report = await run_once(name, module, interceptor, queue_api, phases, cdp)
+                    reports[name].append(report)
+                    print_report(report)
+                if mode == "record":
+                    fixtures.flush()
+        finally:
+            await http_client.close_session()
+    for name, runs_of in reports.items():
+        if len(runs_of) > 1:
+            walls = [report["wall_seconds"] for report in runs_of]
+            rates = [report["jobs_per_minute"] for report in runs_of]
+            print(
+                f"{name:<10} median over {len(runs_of)} runs: "
+                f"{statistics.median(walls):.2f}s, {statistics.median(rates):.2f} jobs/min"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay crawler benchmark")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("crawlers", nargs="*", metavar="crawler", help=", ".join(CRAWLERS))
+    parser.add_argument("--runs", type=int, default=1, help="Replay runs per crawler")
+    parser.add_argument(
+        "--throttle", action="store_true", help="Keep the per-domain rate limits"
+    )
+    args = parser.parse_args()
+    unknown = set(args.crawlers) - set(CRAWLERS)
+    if unknown:
+        parser.error(f"unknown crawlers: {', '.join(sorted(unknown))}")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(bench(args.mode, args.crawlers or CRAWLERS, args.runs, args.throttle))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from selenium_driverless import webdriver
+
+from src.producer import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BROWSER_MAX_RUNS = int(os.getenv("PRODUCER_BROWSER_MAX_RUNS", 20))
+BROWSER_MAX_HEAP_MB = int(os.getenv("PRODUCER_BROWSER_MAX_HEAP_MB", 512))
+LEASE_WAIT_SAMPLES = 100
+
+
+class PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.runs = 0
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` warm Chrome instances and leases them to crawlers.
+    Instances are reset between leases and recycled after `max_runs` leases,
+    when their JS heap grows past `max_heap_mb`, or when a lease fails.
+    """
+
+    def __init__(self, size, max_runs=BROWSER_MAX_RUNS, max_heap_mb=BROWSER_MAX_HEAP_MB):
+        self.size = size
+        self.max_runs = max_runs
+        self.max_heap_mb = max_heap_mb
+        self.lease_waits = deque(maxlen=LEASE_WAIT_SAMPLES)
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _launch(self):
+        options = webdriver.ChromeOptions()
+        options.add_argument("--force-device-scale-factor=0.4")
+        options.add_argument("--high-dpi-support=0.4")
+        driver = await webdriver.Chrome(options=options)
+        await driver.minimize_window()
+        return PooledBrowser(driver)
+
+    async def _heap_mb(self, browser):
+        heap = await browser.driver.execute_script(
+            "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+        )
+        return heap / (1024 * 1024)
+
+    async def _reset(self, browser):
+        await browser.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        await browser.driver.get("about:blank")
+
+    async def _retire(self, browser):
+        try:
+            await browser.driver.quit()
+        except Exception as e:
+            logger.error(f"Failed to quit browser: {e}")
+
+    async def _release(self, browser, healthy):
+        browser.runs += 1
+        try:
+            if (
+                healthy
+                and browser.runs < self.max_runs
+                and await self._heap_mb(browser) < self.max_heap_mb
+            ):
+                await self._reset(browser)
+                self._idle.append(browser)
+                return
+        except Exception as e:
+            logger.error(f"Failed to reset browser: {e}")
+        logger.info(f"Recycling browser after {browser.runs} runs")
+        await self._retire(browser)
+
+    @asynccontextmanager
+    async def lease(self):
+        requested_at = time.monotonic()
+        async with self._slots:
+            wait = time.monotonic() - requested_at
+            self.lease_waits.append(wait)
+            metrics.BROWSER_LEASE_WAIT.observe(wait)
+            browser = self._idle.pop() if self._idle else await self._launch()
+            logger.info(f"Leased browser after waiting {wait:.2f}s")
+            healthy = False
+            try:
+                yield browser.driver
+                healthy = True
+            finally:
+                await self._release(browser, healthy)
+
+    def stats(self):
+        waits = sorted(self.lease_waits)
+        if not waits:
+            return {"leases": 0, "avg_wait": 0.0, "max_wait": 0.0}
+        return {
+            "leases": len(waits),
+            "avg_wait": sum(waits) / len(waits),
+            "max_wait": waits[-1],
+        }
+
+    async def close(self):
+        while self._idle:
+            await self._retire(self._idle.pop())
@@ -1,16 +1,41 @@
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
-    not_cached,
-    send_job_to_queue,
+    new_trace,
+    CrawlResult,
+    filter_uncached,
+    fetch_descriptions,
     try_attempts,
     setup_logger,
+    submit_new_jobs,
+    extract_rows,
+    advance_watermark,
 )
-import time
+from src.producer.crawlers.watermark import watermarks
+from src.producer.crawlers import http_client
 
 
 url = "https://jobs.apple.com/en-us/search?location=united-states-USA&team=apps-and-frameworks-SFTWR-AF+cloud-and-infrastructure-SFTWR-CLD+core-operating-systems-SFTWR-COS+devops-and-site-reliability-SFTWR-DSR+information-systems-and-technology-SFTWR-ISTECH+machine-learning-and-ai-SFTWR-MCHLN+security-and-privacy-SFTWR-SEC+wireless-software-SFTWR-WSFT+software-quality-automation-and-tools-SFTWR-SQAT"
 
+csrf_api_url = "https://jobs.apple.com/api/csrfToken"
+search_api_url = "https://jobs.apple.com/api/role/search"
+detail_api_url = "https://jobs.apple.com/api/role/detail/{position_id}?languageCd=en-us"
+search_api_body = {
+    "query": "",
+    "filters": {
+        "teams": [
+            {"team": "teamsAndSubTeams-SFTWR", "subTeam": f"subTeam-{sub_team}"}
+            for sub_team in [
+                "AF", "CLD", "COS", "DSR", "ISTECH", "MCHLN", "SEC", "WSFT", "SQAT"
+            ]
+        ],
+        "locations": ["postLocation-USA"],
+    },
+    "page": 1,
+    "locale": "en-us",
+    "sort": "newest",
+}
 
 logger = setup_logger("apple", "apple_crawler.log")
 logger.error("Apple crawler started")
@@ -18,41 +43,41 @@ logger.error("Apple crawler started")
 
 async def get_job_links(driver: webdriver.Chrome):
     await driver.get(url)
-    job_elements = await try_attempts(
+    await try_attempts(
         lambda: driver.find_elements(By.CSS_SELECTOR, 'tbody[id^="accordion_"]'),
         0.5,
         20,
         Exception("Could not find job elements"),
     )
+    job_count, rows = await extract_rows(
+        driver,
+        'tbody[id^="accordion_"]',
+        {
+            "id": {"selector": "a.table--advanced-search__title", "attr": "id"},
+            "title": {"selector": "a.table--advanced-search__title"},
+            "link": {"selector": "a.table--advanced-search__title", "prop": "href"},
+        },
+        20,
+    )
     jobs = []
-    for job_element, _ in zip(job_elements, range(20)):
-        job_link_element = await job_element.find_element(
-            By.CSS_SELECTOR, "a.table--advanced-search__title"
-        )
-        job_id = (await job_link_element.get_attribute("id")).split("_")[1] + "_apple"
+    for row in rows:
         try:
-            job_title = await job_link_element.text
-            job_link = await job_link_element.get_attribute("href")
-            if not_cached(job_id) == 200:
-                job = {
-                    "id": job_id,
-                    "title": job_title,
-                    "link": job_link,
-                    "description": "",
-                    "company": "Apple",
-                }
-                jobs.append(job)
+            job = {
+                "id": row["id"].split("_")[1] + "_apple",
+                "title": row["title"],
+                "link": row["link"],
+                "description": "",
+                "company": "Apple",
+                "trace": new_trace(),
+            }
+            jobs.append(job)
         except Exception as e:
             logger.error(f"Error processing job element: {e}", exc_info=True)
-    for job in jobs:
-        try:
-            job["description"] = await get_job_description(driver, job["link"])
-            send_job_to_queue(job)
-            time.sleep(4)
-        except Exception as e:
-            logger.error(f"Error sending job to queue: {e}", exc_info=True)
+    uncached = set(await filter_uncached([job["id"] for job in jobs]))
+    jobs = [job for job in jobs if job["id"] in uncached]
+    await fetch_descriptions(driver, jobs, get_job_description, logger)
 
-    return len(job_elements)
+    return CrawlResult(job_count, len(uncached))
 
 
 async def get_job_description(driver: webdriver.Chrome, job_link: str):
@@ -100,3 +125,71 @@ async def get_job_description(driver: webdriver.Chrome, job_link: str):
         "MINIMUM QUALIFICATIONS: " + minimum_qualifications_text + "\n"
         "PREFERRED QUALIFICATIONS: " + preferred_qualifications_text
     )
+
+
+async def get_job_links_fast():
+    """
+    Browserless variant of get_job_links that reads the jobs search API.
+    Raises when the API response is unusable so the caller can fall back.
+    """
+    session = await http_client.get_session()
+    async with session.get(csrf_api_url) as response:
+        csrf_token = response.headers["x-apple-csrf-token"]
+    data = await http_client.fetch_json(
+        "POST",
+        search_api_url,
+        json=search_api_body,
+        headers={"x-apple-csrf-token": csrf_token},
+    )
+    listings = data["searchResults"]
+    if not listings:
+        raise Exception("Apple search API returned no jobs")
+
+    jobs = []
+    for listing in listings[:20]:
+        position_id = listing["positionId"]
+        slug = listing.get("transformedPostingTitle", "")
+        jobs.append(
+            {
+                "id": position_id + "_apple",
+                "title": listing["postingTitle"],
+                "link": f"https://jobs.apple.com/en-us/details/{position_id}/{slug}",
+                "description": "",
+                "company": "Apple",
+                "trace": new_trace(),
+            }
+        )
+
+    job_ids = [job["id"] for job in jobs]
+    jobs = jobs[: watermarks.cut("apple", job_ids)]
+    new_jobs = await submit_new_jobs(jobs, get_job_description_fast, logger)
+    advance_watermark("apple", job_ids[: len(jobs)])
+    return CrawlResult(len(listings), new_jobs)
+
+
+async def get_job_description_fast(job):
+    job_url = detail_api_url.format(position_id=job["id"].split("_")[0])
+    await throttle(job_url)
+    data = await http_client.fetch_json("GET", job_url)
+    summary = data.get("jobSummary") or ""
+    description = data.get("description") or ""
+    minimum_qualifications_text = ""
+    if data.get("minimumQualifications"):
+        minimum_qualifications_text = "-" + data["minimumQualifications"]
+    preferred_qualifications_text = ""
+    if data.get("preferredQualifications"):
+        preferred_qualifications_text = "-" + data["preferredQualifications"]
+    if (
+        not summary
+        and not description
+        and not minimum_qualifications_text
+        and not preferred_qualifications_text
+    ):
+        raise Exception("All job description fields are None")
+
+    return (
+        "SUMMARY: " + summary + "\n"
+        "DESCRIPTION: " + description + "\n"
+        "MINIMUM QUALIFICATIONS: " + minimum_qualifications_text + "\n"
+        "PREFERRED QUALIFICATIONS: " + preferred_qualifications_text
+    )
@@ -0,0 +1,64 @@
+import json
+import os
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_CONNECTIONS = int(os.getenv("PRODUCER_HTTP_MAX_CONNECTIONS", 20))
+KEEPALIVE_TIMEOUT = int(os.getenv("PRODUCER_HTTP_KEEPALIVE_TIMEOUT", 30))
+DEFAULT_TIMEOUT = float(os.getenv("PRODUCER_HTTP_TIMEOUT", 10))
+
+_session = None
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200].decode(errors='replace')}")
+        self.status = status
+
+
+async def get_session():
+    """
+    Returns the process-wide aiohttp session, creating it on first use so it
+    binds to the running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS, keepalive_timeout=KEEPALIVE_TIMEOUT
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch(method, url, timeout=None, **kwargs):
+    """
+    Sends a request over the shared session and returns (status, body).
+    """
+    session = await get_session()
+    if timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    async with session.request(method, url, **kwargs) as response:
+        return response.status, await response.read()
+
+
+async def fetch_json(method, url, timeout=None, **kwargs):
+    """
+    Same as fetch, but raises on non-2xx responses and decodes the JSON body.
+    """
+    status, body = await fetch(method, url, timeout=timeout, **kwargs)
+    if not 200 <= status < 300:
+        raise HTTPError(status, body)
+    return json.loads(body)
@@ -1,15 +1,65 @@
-import time
+import asyncio
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
-    not_cached,
-    send_job_to_queue,
+    new_trace,
+    CrawlResult,
+    filter_uncached,
+    fetch_descriptions,
     try_attempts,
     setup_logger,
+    submit_new_jobs,
+    html_to_text,
+    extract_rows,
+    advance_watermark,
 )
+from src.producer.crawlers.watermark import watermarks
+from src.producer.crawlers import http_client
+from bs4 import BeautifulSoup
 
 url = "https://www.ibm.com/careers/search?field_keyword_08[0]=Software%20Engineering&field_keyword_08[1]=Infrastructure%20%26%20Technology&field_keyword_08[2]=Cloud&field_keyword_08[3]=Data%20%26%20Analytics&field_keyword_18[0]=Professional&field_keyword_18[1]=Entry%20Level&field_keyword_05[0]=United%20States&q=software%20engineer&sort=dcdate_desc"
-
+search_api_url = "https://www-api.ibm.com/search/api/v2"
+search_api_body = {
+    "appId": "careers",
+    "scopes": ["careers2"],
+    "query": {
+        "bool": {
+            "must": [
+                {
+                    "simple_query_string": {
+                        "query": "software engineer",
+                        "fields": [
+                            "keywords^1",
+                            "body^1",
+                            "url^2",
+                            "description^2",
+                            "title^3",
+                        ],
+                    }
+                }
+            ],
+            "filter": [
+                {
+                    "terms": {
+                        "field_keyword_08": [
+                            "Software Engineering",
+                            "Infrastructure & Technology",
+                            "Cloud",
+                            "Data & Analytics",
+                        ]
+                    }
+                },
+                {"terms": {"field_keyword_18": ["Professional", "Entry Level"]}},
+                {"terms": {"field_keyword_05": ["United States"]}},
+            ],
+        }
+    },
+    "size": 30,
+    "sort": [{"dcdate": "desc"}],
+    "lang": "zz",
+    "_source": ["_id", "title", "url"],
+}
 logger = setup_logger("ibm_crawler", "ibm_crawler.log")
 logger.error("IBM crawler started")
 
@@ -17,8 +67,8 @@ logger.error("IBM crawler started")
 async def get_job_links(driver: webdriver.Chrome):
     try:
         await driver.get(url)
-        time.sleep(5)
-        job_containers = await try_attempts(
+        await asyncio.sleep(5)
+        await try_attempts(
             lambda: driver.find_elements(
                 By.CSS_SELECTOR, "div.bx--card-group__cards__col"
             ),
@@ -26,44 +76,40 @@ async def get_job_links(driver: webdriver.Chrome):
             20,
             Exception("Could not find IBM job containers"),
         )
+        job_count, rows = await extract_rows(
+            driver,
+            "div.bx--card-group__cards__col",
+            {
+                "link": {"selector": "a", "prop": "href"},
+                "title": {"selector": "div.bx--card__heading"},
+            },
+            stop=watermarks.stop_spec("ibm", "link"),
+        )
         jobs = []
-        for job_container in job_containers:
+        for row in rows:
             try:
-                link_element = await job_container.find_element(By.CSS_SELECTOR, "a")
-                job_link = await link_element.get_attribute("href")
-                job_id = (
-                    job_link.split("jobId=")[1].split("&")[0] + "_ibm"
-                    if "jobId=" in job_link
-                    else job_link.split("job/")[1].split("/")[0] + "_ibm"
+                jobs.append(
+                    {
+                        "id": job_id_from_link(row["link"]),
+                        "title": row["title"],
+                        "location": "",
+                        "link": row["link"],
+                        "description": "",
+                        "company": "IBM",
+                        "trace": new_trace(),
+                    }
                 )
-                title_element = await job_container.find_element(
-                    By.CSS_SELECTOR, "div.bx--card__heading"
-                )
-                job_title = await title_element.text
-
-                if not_cached(job_id) == 200:
-                    jobs.append(
-                        {
-                            "id": job_id,
-                            "title": job_title,
-                            "location": "",
-                            "link": job_link,
-                            "description": "",
-                            "company": "IBM",
-                        }
-                    )
             except Exception as e:
                 logger.error(f"Error processing IBM job container: {e}", exc_info=True)
 
-        for job in jobs:
-            try:
-                job["description"] = await get_job_description(driver, job["link"])
-                send_job_to_queue(job)
-                time.sleep(4)
-            except Exception as e:
-                logger.error(f"Error processing IBM job: {e}", exc_info=True)
+        job_ids = [job["id"] for job in jobs]
+        uncached = set(await filter_uncached(job_ids))
+        jobs = [job for job in jobs if job["id"] in uncached]
+
+        await fetch_descriptions(driver, jobs, get_job_description, logger)
+        advance_watermark("ibm", job_ids)
 
-        return len(job_containers)
+        return CrawlResult(job_count, len(uncached))
     except Exception as e:
         logger.error(f"Error in get_job_links: {e}", exc_info=True)
 
@@ -85,3 +131,58 @@ async def get_job_description(driver: webdriver.Chrome, job_link: str):
     except Exception as e:
         logger.error(f"Error in get_job_description: {e}", exc_info=True)
         return ""
+
+
+def job_id_from_link(job_link):
+    return (
+        job_link.split("jobId=")[1].split("&")[0] + "_ibm"
+        if "jobId=" in job_link
+        else job_link.split("job/")[1].split("/")[0] + "_ibm"
+    )
+
+
+async def get_job_links_fast():
+    """
+    Browserless variant of get_job_links that reads the site search API and
+    the server-rendered job pages. Raises when the API response is unusable
+    so the caller can fall back.
+    """
+    data = await http_client.fetch_json("POST", search_api_url, json=search_api_body)
+    listings = data["hits"]["hits"]
+    if not listings:
+        raise Exception("IBM search API returned no jobs")
+
+    jobs = []
+    for listing in listings:
+        job_link = listing["_source"]["url"]
+        jobs.append(
+            {
+                "id": job_id_from_link(job_link),
+                "title": listing["_source"]["title"],
+                "location": "",
+                "link": job_link,
+                "description": "",
+                "company": "IBM",
+                "trace": new_trace(),
+            }
+        )
+
+    job_ids = [job["id"] for job in jobs]
+    jobs = jobs[: watermarks.cut("ibm", job_ids)]
+    new_jobs = await submit_new_jobs(jobs, get_job_description_fast, logger)
+    advance_watermark("ibm", job_ids[: len(jobs)])
+    return CrawlResult(len(listings), new_jobs)
+
+
+async def get_job_description_fast(job):
+    await throttle(job["link"])
+    status, body = await http_client.fetch("GET", job["link"])
+    if status != 200:
+        raise Exception(f"IBM job page returned {status}")
+    soup = BeautifulSoup(body, "html.parser")
+    desc_container = soup.select_one(
+        'div[data-field="description"], .article.article--details'
+    )
+    if desc_container is None:
+        raise Exception("IBM job page has no description container")
+    return html_to_text(str(desc_container), "\n")
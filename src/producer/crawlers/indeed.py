@@ -1,16 +1,22 @@
 import json
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
-    not_cached,
+    new_trace,
+    CrawlResult,
+    filter_uncached,
     send_job_to_queue,
     try_attempts,
     load_cookies,
     update_cookies,
     add_to_cache,
+    extract_rows,
+    extract_text_blocks,
+    advance_watermark,
 )
-import time
-import random
+from src.producer.crawlers.watermark import watermarks
+import asyncio
 
 with open("src/producer/crawlers/blocked.json", "r") as f:
     company_blacklist = set(company.lower() for company in json.load(f))
@@ -21,71 +27,64 @@ url = "https://www.indeed.com/jobs?q=%28%28%22Software%22+OR+%22Backend%22+OR+%2
 async def get_job_links(driver: webdriver.Chrome):
     await load_cookies(driver, "src/producer/crawlers/cookies/indeed.json")
     await driver.get(url)
-    time.sleep(10)
-    job_elements = await try_attempts(
+    await asyncio.sleep(10)
+    await try_attempts(
         lambda: driver.find_elements(By.CSS_SELECTOR, "div.job_seen_beacon"),
         0.5,
         20,
         Exception("Could not find job elements"),
     )
+    job_count, rows = await extract_rows(
+        driver,
+        "div.job_seen_beacon",
+        {
+            "id": {"selector": "[data-jk]", "attr": "data-jk"},
+            "company": {"selector": "[data-testid='company-name']"},
+            "title": {"selector": ".jobTitle"},
+        },
+        15,
+        watermarks.stop_spec("indeed", "id"),
+    )
+    job_rows = {row["id"] + "_indeed": row for row in rows}
     jobs = []
-    for job_element in job_elements[:15]:
-        job_id = (
-            (
-                (await job_element.get_attribute("outerHTML"))
-                .split('data-jk="')[1]
-                .split('"')[0]
-            )
-            + "_indeed"
-        )
-        try:
-            company = await job_element.find_element(
-                By.CSS_SELECTOR, "[data-testid='company-name']"
-            )
-            company = await company.text
-        except Exception:
-            company = "Unknown"
-        if not_cached(job_id) == 200:
-            if company.lower() in company_blacklist:
-                add_to_cache(job_id)
-                continue
-            job_title = await job_element.find_element(By.CSS_SELECTOR, ".jobTitle")
-            job_title = await job_title.text
-            job_title = job_title.strip()
-            job_link = "https://www.indeed.com/applystart?jk=" + job_id.split("_")[0]
-            job = {
-                "id": job_id,
-                "title": job_title,
-                "link": job_link,
-                "company": company,
-            }
-            jobs.append(job)
+    new_ids = await filter_uncached(list(job_rows))
+    for job_id in new_ids:
+        row = job_rows[job_id]
+        company = row["company"] or "Unknown"
+        if company.lower() in company_blacklist:
+            await add_to_cache(job_id)
+            continue
+        job_title = row["title"].strip()
+        job_link = "https://www.indeed.com/applystart?jk=" + job_id.split("_")[0]
+        job = {
+            "id": job_id,
+            "title": job_title,
+            "link": job_link,
+            "company": company,
+            "trace": new_trace(),
+        }
+        jobs.append(job)
     for job in jobs:
         await process_job(driver, job)
+    advance_watermark("indeed", list(job_rows))
     if len(jobs) > 0:
         await driver.get(url)
-    time.sleep(3)
+    await asyncio.sleep(3)
     await update_cookies(driver, "src/producer/crawlers/cookies/indeed.json")
-    return len(job_elements)
+    return CrawlResult(job_count, len(new_ids))
 
 
 async def process_job(driver: webdriver.Chrome, job):
-    await driver.get("https://www.indeed.com/viewjob?jk=" + job["id"].split("_")[0])
-    time.sleep(5)
-    description_container = await try_attempts(
-        lambda: driver.find_element(By.ID, "jobDescriptionText"),
+    job_url = "https://www.indeed.com/viewjob?jk=" + job["id"].split("_")[0]
+    await throttle(job_url)
+    await driver.get(job_url)
+    await asyncio.sleep(5)
+    texts = await try_attempts(
+        lambda: extract_text_blocks(driver, By.CSS_SELECTOR, "#jobDescriptionText"),
         0.5,
         10,
         Exception("Description container not found"),
     )
-    elements = await description_container.find_elements(By.XPATH, ".//*")
-    texts = []
-    for elem in elements:
-        if not await elem.find_elements(By.XPATH, "./*"):
-            text = (await elem.text).strip()
-            if text:
-                texts.append(text)
     description = "\n".join(texts)
     job["description"] = description
-    send_job_to_queue(job)
-    time.sleep(random.randint(3, 6))
+    await send_job_to_queue(job)
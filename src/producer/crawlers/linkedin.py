@@ -1,18 +1,23 @@
 import json
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
-    not_cached,
+    new_trace,
+    CrawlResult,
+    filter_uncached,
     send_job_to_queue,
     try_attempts,
     load_cookies,
     update_cookies,
     add_to_cache,
     setup_logger,
+    extract_rows,
+    extract_text_blocks,
+    advance_watermark,
 )
-import time
-import random
-from bs4 import BeautifulSoup
+from src.producer.crawlers.watermark import watermarks
+import asyncio
 
 
 with open("src/producer/crawlers/blocked.json", "r") as f:
@@ -28,65 +33,73 @@ async def get_job_links(driver: webdriver.Chrome):
     try:
         await load_cookies(driver, "src/producer/crawlers/cookies/linkedin.json")
         await driver.get(url)
-        time.sleep(5)
+        await asyncio.sleep(5)
         job_elements = await try_attempts(
             lambda: driver.find_elements(By.CSS_SELECTOR, "[data-occludable-job-id]"),
             0.5,
             20,
             Exception("Could not find job elements"),
         )
+        _, rows = await extract_rows(
+            driver,
+            "[data-occludable-job-id]",
+            {
+                "id": {"attr": "data-occludable-job-id"},
+                "company": {"selector": ".artdeco-entity-lockup__subtitle"},
+                "title": {"selector": "strong"},
+            },
+            15,
+            watermarks.stop_spec("linkedin", "id"),
+        )
+        trace = new_trace()
+        job_rows = {}
+        for job_element, row in zip(job_elements, rows):
+            job_rows[row["id"] + "_linkedin"] = (job_element, row)
+
         jobs = []
-        for job_element in job_elements[:15]:
+        new_ids = await filter_uncached(list(job_rows))
+        for job_id in new_ids:
+            job_element, row = job_rows[job_id]
             try:
-                job_id_outer_html = await job_element.execute_script(
-                    "return arguments[0].outerHTML", job_element, timeout=10
-                )
-                job_id = job_id_outer_html.split('data-occludable-job-id="')[1].split(
-                    '"'
-                )[0]
-                job_id += "_linkedin"
+                if not row["company"]:
+                    raise Exception(f"Could not find company for job {job_id}")
+                company = row["company"].split(" · ")[0].strip()
 
-                company_el = await job_element.find_element(
-                    By.CSS_SELECTOR, ".artdeco-entity-lockup__subtitle"
+                if company.lower() in company_blacklist:
+                    await add_to_cache(job_id)
+                    continue
+                await throttle(url)
+                await job_element.click()
+                blocks = await try_attempts(
+                    lambda: extract_text_blocks(
+                        driver,
+                        By.CSS_SELECTOR,
+                        ".jobs-description__container",
+                        leaf_only=False,
+                    ),
+                    0.5,
+                    10,
+                    Exception("Description container not found"),
                 )
-                company = (await company_el.text).split(" · ")[0].strip()
-
-                if not_cached(job_id) == 200:
-                    if company.lower() in company_blacklist:
-                        add_to_cache(job_id)
-                        continue
-                    await job_element.click()
-                    description_container = await try_attempts(
-                        lambda: driver.find_element(
-                            By.CSS_SELECTOR, ".jobs-description__container"
-                        ),
-                        0.5,
-                        10,
-                        Exception("Description container not found"),
-                    )
-                    outer_html = await description_container.execute_script(
-                        "return arguments[0].outerHTML", description_container, timeout=10
-                    )
-                    soup = BeautifulSoup(outer_html, "html.parser")
-                    description = " \n ".join(soup.stripped_strings)
-                    job_title_el = await job_element.find_element(By.TAG_NAME, "strong")
-                    job_title = (await job_title_el.text).strip()
-                    job_link = (
-                        "https://www.linkedin.com/jobs/view/" + job_id.split("_")[0]
-                    )
-                    job = {
-                        "id": job_id,
-                        "title": job_title,
-                        "link": job_link,
-                        "description": description,
-                        "company": company,
-                    }
-                    jobs.append(job)
-                    send_job_to_queue(job)
-                    time.sleep(random.randint(3, 6))
+                description = " \n ".join(blocks)
+                job_title = (row["title"] or "").strip()
+                job_link = (
+                    "https://www.linkedin.com/jobs/view/" + job_id.split("_")[0]
+                )
+                job = {
+                    "id": job_id,
+                    "title": job_title,
+                    "link": job_link,
+                    "description": description,
+                    "company": company,
+                    "trace": dict(trace),
+                }
+                jobs.append(job)
+                await send_job_to_queue(job)
             except Exception as e:
                 logger.error(f"Error processing job element: {e}", exc_info=True)
+        advance_watermark("linkedin", list(job_rows))
         await update_cookies(driver, "src/producer/crawlers/cookies/linkedin.json")
-        return len(job_elements)
+        return CrawlResult(len(job_elements), len(new_ids))
     except Exception as e:
         logger.error(f"Error in get_job_links: {e}", exc_info=True)
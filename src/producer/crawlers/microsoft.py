@@ -1,17 +1,38 @@
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
-    not_cached,
-    send_job_to_queue,
+    new_trace,
+    CrawlResult,
+    filter_uncached,
+    fetch_descriptions,
     try_attempts,
     setup_logger,
+    submit_new_jobs,
+    html_to_text,
+    extract_rows,
+    extract_text_blocks,
+    advance_watermark,
 )
-import time
-from bs4 import BeautifulSoup
+from src.producer.crawlers.watermark import watermarks
+from src.producer.crawlers import http_client
 
 
 url = "https://jobs.careers.microsoft.com/global/en/search?lc=California%2C%20United%20States&lc=Washington%2C%20United%20States&p=Software%20Engineering&rt=Individual%20Contributor&l=en_us&pg=1&pgSz=20&o=Recent&flt=true"
 
+search_api_url = "https://gcsservices.careers.microsoft.com/search/api/v1/search"
+search_api_params = [
+    ("lc", "California, United States"),
+    ("lc", "Washington, United States"),
+    ("p", "Software Engineering"),
+    ("rt", "Individual Contributor"),
+    ("l", "en_us"),
+    ("pg", "1"),
+    ("pgSz", "20"),
+    ("o", "Recent"),
+    ("flt", "true"),
+]
+job_api_url = "https://gcsservices.careers.microsoft.com/search/api/v1/job/{job_id}?lang=en_us"
 logger = setup_logger("microsoft_crawler", "microsoft_crawler.log")
 logger.error("Microsoft crawler started")
 
@@ -19,68 +40,54 @@ logger.error("Microsoft crawler started")
 async def get_job_links(driver: webdriver.Chrome):
     try:
         await driver.get(url, wait_load=True)
-        list_element = await try_attempts(
+        await try_attempts(
             lambda: driver.find_element(By.CSS_SELECTOR, 'div.ms-List[role="list"]'),
             0.5,
             20,
             Exception("Could not find list element"),
         )
-        job_elements = await list_element.find_elements(
-            By.CSS_SELECTOR, 'div[role="listitem"]'
+        job_count, rows = await extract_rows(
+            driver,
+            'div.ms-List[role="list"] div[role="listitem"]',
+            {
+                "title": {"selector": "h2"},
+                "location": {"selector": "span", "contains": "United States"},
+                "label": {
+                    "selector": 'div[aria-label^="Job item"]',
+                    "attr": "aria-label",
+                },
+            },
+            20,
+            watermarks.stop_spec("microsoft", "label"),
         )
         jobs = []
 
-        for job_element, _ in zip(job_elements, range(20)):
+        for row in rows:
             try:
-                job_title_element = await job_element.find_element(
-                    By.CSS_SELECTOR, "h2"
-                )
-                job_title = await job_title_element.text
-
-                job_location_element = await job_element.find_element(
-                    By.XPATH, "//span[contains(text(), 'United States')]"
-                )
-                job_location = await job_location_element.text
-
-                job_id_element = await job_element.find_element(
-                    By.CSS_SELECTOR, 'div[aria-label^="Job item"]'
-                )
-
-                outer_html = await job_id_element.execute_script(
-                    "return arguments[0].outerHTML", job_id_element, timeout=10
-                )
-                soup = BeautifulSoup(outer_html, "html.parser")
-                job_id = (
-                    soup.find("div", {"aria-label": True})["aria-label"]
-                    .split("Job item ")[1]
-                    .split('"')[0]
-                )
+                job_id = row["label"].split("Job item ")[1].split('"')[0]
                 job_link = f"https://jobs.careers.microsoft.com/global/en/job/{job_id}"
-                job_id = job_id + "_microsoft"
-
-                if not_cached(job_id) == 200:
-                    jobs.append(
-                        {
-                            "id": job_id,
-                            "title": job_title,
-                            "location": job_location,
-                            "link": job_link,
-                            "description": "",
-                            "company": "Microsoft",
-                        }
-                    )
+                jobs.append(
+                    {
+                        "id": job_id + "_microsoft",
+                        "title": row["title"],
+                        "location": row["location"] or "",
+                        "link": job_link,
+                        "description": "",
+                        "company": "Microsoft",
+                        "trace": new_trace(),
+                    }
+                )
             except Exception as e:
                 logger.error(f"Error processing job element: {e}", exc_info=True)
 
-        for job in jobs:
-            try:
-                job["description"] = await get_job_description(driver, job["link"])
-                send_job_to_queue(job)
-                time.sleep(4)
-            except Exception as e:
-                logger.error(f"Error processing job: {e}", exc_info=True)
+        job_ids = [job["id"] for job in jobs]
+        uncached = set(await filter_uncached(job_ids))
+        jobs = [job for job in jobs if job["id"] in uncached]
+
+        await fetch_descriptions(driver, jobs, get_job_description, logger)
+        advance_watermark("microsoft", job_ids)
 
-        return len(job_elements)
+        return CrawlResult(job_count, len(uncached))
     except Exception as e:
         logger.error(f"Error in get_job_links: {e}", exc_info=True)
 
@@ -88,21 +95,62 @@ async def get_job_links(driver: webdriver.Chrome):
 async def get_job_description(driver: webdriver.Chrome, job_link: str):
     try:
         await driver.get(job_link)
-        qualifications_element = await try_attempts(
-            lambda: driver.find_element(
-                By.XPATH, "//h3[contains(text(), 'Qualifications')]"
+        blocks = await try_attempts(
+            lambda: extract_text_blocks(
+                driver,
+                By.XPATH,
+                "//h3[contains(text(), 'Qualifications')]/..",
+                leaf_only=False,
             ),
             0.5,
             20,
             Exception("Could not find qualifications element"),
         )
-        parent_element = await qualifications_element.find_element(By.XPATH, "..")
-        outer_html = await parent_element.execute_script(
-            "return arguments[0].outerHTML", parent_element, timeout=10
-        )
-        soup = BeautifulSoup(outer_html, "html.parser")
-        description = " \n ".join(soup.stripped_strings)
-        return description
+        return " \n ".join(blocks)
     except Exception as e:
         logger.error(f"Error in get_job_description: {e}", exc_info=True)
         return ""
+
+
+async def get_job_links_fast():
+    """
+    Browserless variant of get_job_links that reads the careers search API.
+    Raises when the API response is unusable so the caller can fall back.
+    """
+    data = await http_client.fetch_json("GET", search_api_url, params=search_api_params)
+    listings = data["operationResult"]["result"]["jobs"]
+    if not listings:
+        raise Exception("Microsoft search API returned no jobs")
+
+    jobs = []
+    for listing in listings[:20]:
+        job_id = str(listing["jobId"])
+        locations = listing.get("properties", {}).get("locations") or [""]
+        jobs.append(
+            {
+                "id": job_id + "_microsoft",
+                "title": listing["title"],
+                "location": locations[0],
+                "link": f"https://jobs.careers.microsoft.com/global/en/job/{job_id}",
+                "description": "",
+                "company": "Microsoft",
+                "trace": new_trace(),
+            }
+        )
+
+    job_ids = [job["id"] for job in jobs]
+    jobs = jobs[: watermarks.cut("microsoft", job_ids)]
+    new_jobs = await submit_new_jobs(jobs, get_job_description_fast, logger)
+    advance_watermark("microsoft", job_ids[: len(jobs)])
+    return CrawlResult(len(listings), new_jobs)
+
+
+async def get_job_description_fast(job):
+    job_url = job_api_url.format(job_id=job["id"].split("_")[0])
+    await throttle(job_url)
+    data = await http_client.fetch_json("GET", job_url)
+    result = data["operationResult"]["result"]
+    description = html_to_text(result.get("qualifications"))
+    if not description:
+        raise Exception("Microsoft job API returned no qualifications")
+    return "Qualifications \n " + description
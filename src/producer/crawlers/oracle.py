@@ -1,17 +1,42 @@
-import time
-import random
+import asyncio
 
 from selenium_driverless import webdriver
 from selenium_driverless.types.by import By
+from src.producer.crawlers.ratelimit import throttle
 from src.producer.crawlers.util import (
+    new_trace,
+    CrawlResult,
     try_attempts,
     send_job_to_queue,
-    not_cached,
+    filter_uncached,
     setup_logger,
+    submit_new_jobs,
+    html_to_text,
+    extract_rows,
+    extract_text_blocks,
+    advance_watermark,
 )
+from src.producer.crawlers.watermark import watermarks
+from src.producer.crawlers import http_client
 
 
 url = "https://careers.oracle.com/jobs/#en/sites/jobsearch/requisitions?lastSelectedFacet=AttributeChar29&location=United+States&locationId=300000000149325&mode=location&selectedCategoriesFacet=300000001917356%3B300000001917346&selectedFlexFieldsFacets=%22AttributeChar12%7CLess+than+10+applicants%7C%7CAttributeChar6%7CSee+Job+Description%3B0+to+2%2B+years%3BNot+Applicable%7C%7CAttributeChar29%7CIndividual+Contributor%22&sortBy=POSTING_DATES_DESC"
+api_base_url = "https://eeho.fa.us2.oraclecloud.com/hcmRestApi/resources/latest"
+site_number = "CX_45001"
+search_api_url = (
+    f"{api_base_url}/recruitingCEJobRequisitions?onlyData=true"
+    "&expand=requisitionList.secondaryLocations"
+    f"&finder=findReqs;siteNumber={site_number},limit=25,"
+    "lastSelectedFacet=AttributeChar29,locationId=300000000149325,"
+    "selectedCategoriesFacet=300000001917356%3B300000001917346,"
+    "selectedFlexFieldsFacets=%22AttributeChar12%7CLess+than+10+applicants%7C%7C"
+    "AttributeChar6%7CSee+Job+Description%3B0+to+2%2B+years%3BNot+Applicable%7C%7C"
+    "AttributeChar29%7CIndividual+Contributor%22,sortBy=POSTING_DATES_DESC"
+)
+detail_api_url = (
+    f"{api_base_url}/recruitingCEJobRequisitionDetails?onlyData=true&expand=all"
+    "&finder=ById;Id=%22{job_id}%22,siteNumber=" + site_number
+)
 
 logger = setup_logger("oracle_crawler", "oracle_crawler.log")
 logger.error("Oracle crawler started")
@@ -20,79 +45,117 @@ logger.error("Oracle crawler started")
 async def get_job_links(driver: webdriver.Chrome):
     try:
         await driver.get(url)
-        time.sleep(10)
+        await asyncio.sleep(10)
 
-        job_elements = await try_attempts(
+        await try_attempts(
             lambda: driver.find_elements(By.CSS_SELECTOR, "div.job-grid-item__link"),
             0.5,
             20,
             Exception("Could not find job-grid-item__link elements"),
         )
+        job_count, rows = await extract_rows(
+            driver,
+            "div.job-grid-item__link",
+            {
+                "id": {"attr": "id"},
+                "title": {"selector": "span.job-tile__title"},
+            },
+            stop=watermarks.stop_spec("oracle", "id"),
+        )
+        titles = {f"{row['id']}_oracle": row["title"] for row in rows if row["id"]}
 
         jobs = []
-        for job_element in job_elements:
-            try:
-                job_id = await job_element.get_attribute("id")
-                job_id = f"{job_id}_oracle"
-                if not_cached(job_id) == 200:
-                    company = "Oracle"
-
-                    job_title_elem = await try_attempts(
-                        lambda: job_element.find_element(
-                            By.CSS_SELECTOR, "span.job-tile__title"
-                        ),
-                        0.5,
-                        10,
-                        Exception(f"Could not find job title element for job {job_id}"),
-                    )
-                    job_title = await job_title_elem.text
-                    job_title = job_title.strip()
-
-                    job_link = f"https://careers.oracle.com/jobs/#en/sites/jobsearch/job/{job_id.split('_')[0]}/"
-
-                    job_data = {
-                        "id": job_id,
-                        "title": job_title,
-                        "link": job_link,
-                        "company": company,
-                    }
-                    jobs.append(job_data)
-            except Exception as e:
-                logger.error(f"Error processing job element: {e}", exc_info=True)
+        new_ids = await filter_uncached(list(titles))
+        for job_id in new_ids:
+            if not titles[job_id]:
+                logger.error(f"Could not find job title element for job {job_id}")
+                continue
+            job_link = f"https://careers.oracle.com/jobs/#en/sites/jobsearch/job/{job_id.split('_')[0]}/"
+            jobs.append(
+                {
+                    "id": job_id,
+                    "title": titles[job_id],
+                    "link": job_link,
+                    "company": "Oracle",
+                    "trace": new_trace(),
+                }
+            )
 
         for job in jobs:
             await process_job(driver, job)
+        advance_watermark("oracle", list(titles))
 
         if len(jobs) > 0:
             await driver.get(url)
-        return len(job_elements)
+        return CrawlResult(job_count, len(new_ids))
     except Exception as e:
         logger.error(f"Error in get_job_links: {e}", exc_info=True)
 
 
 async def process_job(driver: webdriver.Chrome, job):
     try:
+        await throttle(job["link"])
         await driver.get(job["link"])
-        description_container = await try_attempts(
-            lambda: driver.find_element(
-                By.CSS_SELECTOR, "div.job-details__description-content.basic-formatter"
+        texts = await try_attempts(
+            lambda: extract_text_blocks(
+                driver,
+                By.CSS_SELECTOR,
+                "div.job-details__description-content.basic-formatter",
             ),
             0.5,
             15,
             Exception("Job description container not found"),
         )
-
-        elements = await description_container.find_elements(By.XPATH, ".//*")
-        texts = []
-        for elem in elements:
-            if not await elem.find_elements(By.XPATH, "./*"):
-                text = (await elem.text).strip()
-                if text:
-                    texts.append(text)
-
         description = "\n".join(texts)
         job["description"] = description
-        send_job_to_queue(job)
-        time.sleep(random.randint(3, 6))
+        await send_job_to_queue(job)
     except Exception as e:
         logger.error(f"Error processing job: {e}", exc_info=True)
+
+
+async def get_job_links_fast():
+    """
+    Browserless variant of get_job_links that reads the recruiting REST API.
+    Raises when the API response is unusable so the caller can fall back.
+    """
+    data = await http_client.fetch_json("GET", search_api_url)
+    listings = data["items"][0]["requisitionList"]
+    if not listings:
+        raise Exception("Oracle requisitions API returned no jobs")
+
+    jobs = []
+    for listing in listings:
+        job_id = str(listing["Id"])
+        jobs.append(
+            {
+                "id": f"{job_id}_oracle",
+                "title": listing["Title"].strip(),
+                "link": f"https://careers.oracle.com/jobs/#en/sites/jobsearch/job/{job_id}/",
+                "company": "Oracle",
+                "trace": new_trace(),
+            }
+        )
+
+    job_ids = [job["id"] for job in jobs]
+    jobs = jobs[: watermarks.cut("oracle", job_ids)]
+    new_jobs = await submit_new_jobs(jobs, get_job_description_fast, logger)
+    advance_watermark("oracle", job_ids[: len(jobs)])
+    return CrawlResult(len(listings), new_jobs)
+
+
+async def get_job_description_fast(job):
+    job_url = detail_api_url.format(job_id=job["id"].split("_")[0])
+    await throttle(job_url)
+    data = await http_client.fetch_json("GET", job_url)
+    details = data["items"][0]
+    sections = [
+        details.get("ExternalDescriptionStr"),
+        details.get("ExternalResponsibilitiesStr"),
+        details.get("ExternalQualificationsStr"),
+    ]
+    description = "\n".join(
+        html_to_text(section, "\n") for section in sections if section
+    )
+    if not description:
+        raise Exception("Oracle requisition details have no description")
+    return description
@@ -0,0 +1,107 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlparse
+
+# domain: (requests per second, burst size, max jitter in seconds)
+RATE_LIMITS = {
+    "microsoft.com": (1 / 4, 1, 1.0),
+    "apple.com": (1 / 4, 1, 1.0),
+    "ibm.com": (1 / 4, 1, 1.0),
+    "oracle.com": (1 / 3, 1, 3.0),
+    "oraclecloud.com": (1 / 3, 1, 3.0),
+    "linkedin.com": (1 / 3, 1, 3.0),
+    "indeed.com": (1 / 3, 1, 3.0),
+}
+DEFAULT_RATE_LIMIT = (1 / 4, 1, 1.0)
+
+# domain: how many pages of it a single crawler run may load at once
+CONCURRENCY_LIMITS = {
+    "microsoft.com": 3,
+    "apple.com": 2,
+    "ibm.com": 3,
+}
+DEFAULT_CONCURRENCY_LIMIT = 1
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, jitter):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+        if self.jitter:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
+
+class RateLimiter:
+    """
+    Keeps one token bucket per target domain so each site is paced on its own
+    without blocking crawlers that talk to other sites.
+    """
+
+    def __init__(
+        self,
+        limits=RATE_LIMITS,
+        default=DEFAULT_RATE_LIMIT,
+        concurrency_limits=CONCURRENCY_LIMITS,
+        default_concurrency=DEFAULT_CONCURRENCY_LIMIT,
+    ):
+        self.limits = limits
+        self.default = default
+        self.concurrency_limits = concurrency_limits
+        self.default_concurrency = default_concurrency
+        self._buckets = {}
+
+    def _domain(self, url, limits):
+        host = urlparse(url).hostname or url
+        parts = host.split(".")
+        for i in range(len(parts) - 1):
+            domain = ".".join(parts[i:])
+            if domain in limits:
+                return domain
+        return host
+
+    def concurrency(self, url):
+        domain = self._domain(url, self.concurrency_limits)
+        return self.concurrency_limits.get(domain, self.default_concurrency)
+
+    async def acquire(self, url):
+        domain = self._domain(url, self.limits)
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = TokenBucket(*self.limits.get(domain, self.default))
+            self._buckets[domain] = bucket
+        await bucket.acquire()
+
+
+rate_limiter = RateLimiter()
+
+
+async def throttle(url):
+    """
+    Waits until the domain of the given URL may be hit again.
+    """
+    await rate_limiter.acquire(url)
+
+
+def max_concurrency(url):
+    """
+    How many pages of the URL's domain one crawler run may load in parallel.
+    """
+    return rate_limiter.concurrency(url)
@@ -1,28 +1,164 @@
-import requests
 import json
 from dotenv import load_dotenv
 import os
+import asyncio
 import time
+from collections import OrderedDict, namedtuple
+from src.producer.crawlers import http_client
+from src.producer.crawlers.ratelimit import max_concurrency, throttle
+from src.producer.crawlers.watermark import watermarks
 from selenium_driverless import webdriver
+from selenium_driverless.types.by import By
+from bs4 import BeautifulSoup
 import logging
 
 load_dotenv()
 
 API_BASE_URL = "http://localhost:" + str(os.getenv("QUEUE_API_PORT"))
+SEEN_CACHE_SIZE = int(os.getenv("PRODUCER_SEEN_CACHE_SIZE", 10000))
+SEEN_CACHE_TTL = int(os.getenv("PRODUCER_SEEN_CACHE_TTL", 86400))
 
 
-def not_cached(key):
+class SeenCache:
+    """
+    Bounded LRU of job IDs already known to the Queue API, with a TTL so
+    entries are eventually re-confirmed against Redis.
+    """
+
+    def __init__(self, max_size=SEEN_CACHE_SIZE, ttl=SEEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def add(self, key):
+        self._entries[key] = time.monotonic() + self.ttl
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+seen_cache = SeenCache()
+
+# What a crawler run saw: listing elements on the page and how many were new.
+CrawlResult = namedtuple("CrawlResult", ["found", "new"])
+
+
+async def not_cached(key):
+    if key in seen_cache:
+        return 409
     url = f"{API_BASE_URL}/check"
-    params = {"key": key}
-    response = requests.get(url, params=params)
-    return response.status_code
+    status, _ = await http_client.fetch("GET", url, params={"key": key})
+    if status == 409:
+        seen_cache.add(key)
+    return status
+
+
+async def filter_uncached(keys):
+    """
+    Returns the subset of keys the Queue API has not seen yet, preserving order.
+    Keys already confirmed as seen are answered from the in-process cache and
+    the rest are checked in a single request.
+    """
+    candidates = [key for key in dict.fromkeys(keys) if key not in seen_cache]
+    if not candidates:
+        return []
+
+    url = f"{API_BASE_URL}/check/batch"
+    response = await http_client.fetch_json(
+        "POST", url, json={"keys": candidates}
+    )
+    uncached = set(response["uncached"])
+
+    for key in candidates:
+        if key not in uncached:
+            seen_cache.add(key)
+    return [key for key in candidates if key in uncached]
+
+
+def advance_watermark(source, job_ids):
+    """
+    Moves the source's watermark up to the newest of job_ids (newest first)
+    that the Queue API now knows, stopping at the first one it does not.
+    """
+    watermarks.advance(source, job_ids, lambda job_id: job_id in seen_cache)
+
+
+async def submit_new_jobs(jobs, get_description, logger):
+    """
+    Dedups jobs in one batch, fills in descriptions for the new ones and sends
+    them to the queue. Returns the number of new jobs.
+    """
+    new_ids = set(await filter_uncached([job["id"] for job in jobs]))
+    for job in jobs:
+        if job["id"] not in new_ids:
+            continue
+        try:
+            job["description"] = await get_description(job)
+            await send_job_to_queue(job)
+        except Exception as e:
+            logger.error(f"Error processing job {job['id']}: {e}", exc_info=True)
+    return len(new_ids)
+
+
+async def fetch_descriptions(
+    driver: webdriver.Chrome, jobs, get_description, logger
+):
+    """
+    Fills in descriptions for jobs using as many background tabs of the same
+    browser as the domain's concurrency limit allows, and sends each job to
+    the queue as soon as its description is ready. Tabs share the per-domain
+    rate limiter, so pacing still holds.
+    """
+    if not jobs:
+        return
+    tabs = max_concurrency(jobs[0]["link"])
+    pending = asyncio.Queue()
+    for job in jobs:
+        pending.put_nowait(job)
+
+    async def worker(target):
+        while not pending.empty():
+            job = pending.get_nowait()
+            try:
+                await throttle(job["link"])
+                job["description"] = await get_description(target, job["link"])
+                await send_job_to_queue(job)
+            except Exception as e:
+                logger.error(f"Error processing job {job['id']}: {e}", exc_info=True)
+
+    async def tab_worker():
+        tab = await driver.new_window("tab", activate=False)
+        try:
+            await worker(tab)
+        finally:
+            await tab.close()
+
+    if tabs <= 1 or len(jobs) == 1:
+        await worker(driver)
+        return
+    await asyncio.gather(*(tab_worker() for _ in range(min(tabs, len(jobs)))))
+
+
+def html_to_text(html, separator=" \n "):
+    return separator.join(BeautifulSoup(html or "", "html.parser").stripped_strings)
 
 
-def add_to_cache(key):
+async def add_to_cache(key):
     url = f"{API_BASE_URL}/checked"
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url, headers=headers, data=json.dumps({"id": key}))
-    return response.status_code
+    status, _ = await http_client.fetch("POST", url, json={"id": key})
+    if status == 200:
+        seen_cache.add(key)
+    return status
 
 
 def setup_logger(name, log_file, level=logging.ERROR):
@@ -42,25 +178,139 @@ def setup_logger(name, log_file, level=logging.ERROR):
     return logger
 
 
-def send_job_to_queue(job):
+def new_trace():
+    """
+    Freshness trace for a job found now. The queue API and every consumer
+    stage add their own timestamps to it.
+    """
+    return {"discovered": time.time()}
+
+
+async def send_job_to_queue(job):
     url = f"{API_BASE_URL}/submit"
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url, headers=headers, data=json.dumps(job))
-    return response.status_code
+    job.setdefault("trace", new_trace())["submitted"] = time.time()
+    status, _ = await http_client.fetch("POST", url, json=job)
+    if status == 200:
+        seen_cache.add(job["id"])
+    return status
 
 
 async def try_attempts(coroutine, delay=0.1, max_attempts=2, exception=None):
+    """
+    Polls coroutine until it returns something truthy, sleeping `delay`
+    between attempts whether it raised or came back empty. Raises `exception`
+    (or returns None without one) once the attempts run out.
+    """
     for attempt in range(max_attempts):
         try:
             element = await coroutine()
             if element:
                 return element
-        except:
-            if attempt == max_attempts - 1:
-                if exception:
-                    raise exception
-                return None
-            time.sleep(delay)
+        except Exception:
+            pass
+        if attempt < max_attempts - 1:
+            await asyncio.sleep(delay)
+    if exception:
+        raise exception
+    return None
+
+
+EXTRACT_ROWS_SCRIPT = """
+const [rowSelector, fields, limit] = [arguments[0], JSON.parse(arguments[1]), arguments[2]];
+const stop = arguments[3] ? JSON.parse(arguments[3]) : null;
+const marks = new Set(stop ? stop.marks : []);
+const rows = Array.from(document.querySelectorAll(rowSelector));
+const readField = (row, spec) => {
+    let elements = spec.selector ? Array.from(row.querySelectorAll(spec.selector)) : [row];
+    if (spec.contains) {
+        elements = elements.filter((el) => (el.textContent || "").includes(spec.contains));
+    }
+    const el = elements[0];
+    if (!el) return null;
+    if (spec.attr) return el.getAttribute(spec.attr);
+    if (spec.prop) return el[spec.prop];
+    return (el.innerText || el.textContent || "").trim();
+};
+const isMarked = (value) =>
+    String(value || "").split(/[^A-Za-z0-9-]+/).some((token) => marks.has(token));
+const extracted = [];
+let streak = 0;
+for (const row of rows.slice(0, limit || rows.length)) {
+    const values = {};
+    for (const [name, spec] of Object.entries(fields)) values[name] = readField(row, spec);
+    extracted.push(values);
+    streak = stop && isMarked(values[stop.field]) ? streak + 1 : 0;
+    if (stop && streak >= stop.run) break;
+}
+return JSON.stringify({count: rows.length, rows: extracted});
+"""
+
+EXTRACT_TEXT_SCRIPT = """
+const [by, selector, leafOnly] = arguments;
+const root = by === "xpath"
+    ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : document.querySelector(selector);
+if (!root) return null;
+const blocks = [];
+if (leafOnly) {
+    for (const el of root.querySelectorAll("*")) {
+        if (el.children.length) continue;
+        const text = (el.innerText || "").trim();
+        if (text) blocks.push(text);
+    }
+} else {
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        const text = walker.currentNode.nodeValue.trim();
+        if (text) blocks.push(text);
+    }
+}
+return JSON.stringify(blocks);
+"""
+
+
+async def extract_rows(
+    driver: webdriver.Chrome, row_selector, fields, limit=None, stop=None
+):
+    """
+    Reads every listing row matching row_selector in a single script call.
+
+    fields maps a name to a spec: "selector" (CSS, relative to the row; the
+    row itself when omitted), optional "contains" text filter, and either
+    "attr" (attribute), "prop" (DOM property) or neither (trimmed innerText).
+    Returns (total row count, list of dicts for the first `limit` rows).
+    With stop (a WatermarkStore.stop_spec), reading also ends at the first
+    run of rows whose stop field holds a known job ID.
+    """
+    payload = await driver.execute_script(
+        EXTRACT_ROWS_SCRIPT,
+        row_selector,
+        json.dumps(fields),
+        limit,
+        json.dumps(stop) if stop else None,
+        timeout=10,
+    )
+    payload = json.loads(payload)
+    return payload["count"], payload["rows"]
+
+
+async def extract_text_blocks(
+    driver: webdriver.Chrome, by, selector, leaf_only=True
+):
+    """
+    Returns the text blocks under the element found by `by`/`selector` in a
+    single script call, or None when the element is not on the page yet.
+    With leaf_only the blocks are the innerText of childless elements,
+    otherwise every non-empty text node (like BeautifulSoup.stripped_strings).
+    """
+    payload = await driver.execute_script(
+        EXTRACT_TEXT_SCRIPT,
+        "xpath" if by == By.XPATH else "css",
+        selector,
+        leaf_only,
+        timeout=10,
+    )
+    return json.loads(payload) if payload else None
 
 
 async def load_cookies(driver: webdriver.Chrome, file_address: str):
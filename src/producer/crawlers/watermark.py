@@ -0,0 +1,99 @@
+import json
+import os
+from itertools import takewhile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WATERMARKS_ENABLED = os.getenv("PRODUCER_WATERMARKS", "false").lower() == "true"
+WATERMARK_PATH = os.getenv(
+    "PRODUCER_WATERMARK_PATH", "src/producer/crawlers/watermarks.json"
+)
+WATERMARK_DEPTH = int(os.getenv("PRODUCER_WATERMARK_DEPTH", 5))
+# Known jobs in a row that end a page, so one pinned or promoted listing at
+# the top does not hide the new jobs below it.
+WATERMARK_RUN = 2
+
+
+class WatermarkStore:
+    """
+    Newest job IDs each source has delivered, kept in memory and mirrored to
+    a JSON file. Listings are sorted newest first, so a crawler can stop
+    reading a page once it reaches jobs it already handled.
+
+    A watermark only moves past jobs the Queue API has confirmed, so a job
+    that failed to submit is retried on the next run.
+    """
+
+    def __init__(
+        self,
+        path=WATERMARK_PATH,
+        depth=WATERMARK_DEPTH,
+        run=WATERMARK_RUN,
+        enabled=WATERMARKS_ENABLED,
+    ):
+        self.path = path
+        self.depth = depth
+        self.run = run
+        self.enabled = enabled
+        self._marks = {}
+        if enabled and os.path.exists(path):
+            with open(path, "r") as f:
+                self._marks = json.load(f)
+
+    def _run_length(self, marks):
+        return min(self.run, len(marks))
+
+    def stop_spec(self, source, field):
+        """
+        Stop condition for extract_rows: stop once `field` of WATERMARK_RUN
+        rows in a row holds a known job ID. None when the source has no
+        watermark yet.
+        """
+        marks = self._marks.get(source) if self.enabled else None
+        if not marks:
+            return None
+        return {
+            "field": field,
+            "marks": [job_id.split("_")[0] for job_id in marks],
+            "run": self._run_length(marks),
+        }
+
+    def cut(self, source, job_ids):
+        """
+        How many of the newest-first job_ids to process: up to and including
+        the first run of known jobs, or all of them when the page is all new.
+        """
+        marks = self._marks.get(source) if self.enabled else None
+        if not marks:
+            return len(job_ids)
+        known, run, streak = set(marks), self._run_length(marks), 0
+        for index, job_id in enumerate(job_ids):
+            streak = streak + 1 if job_id in known else 0
+            if streak >= run:
+                return index + 1
+        return len(job_ids)
+
+    def advance(self, source, job_ids, confirmed):
+        """
+        Records the leading job_ids that `confirmed` accepts as the source's
+        newest, keeping the `depth` newest marks overall.
+        """
+        if not self.enabled:
+            return
+        newest = list(takewhile(confirmed, job_ids))
+        previous = self._marks.get(source, [])
+        marks = list(dict.fromkeys(newest + previous))[: self.depth]
+        if marks != previous:
+            self._marks[source] = marks
+            self.save()
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self._marks, f, indent=4)
+        os.replace(temp_path, self.path)
+
+
+watermarks = WatermarkStore()
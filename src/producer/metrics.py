@@ -0,0 +1,46 @@
+import prometheus_client
+
+DURATION_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+WAIT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CRAWLER_RUN_DURATION = prometheus_client.Histogram(
+    "producer_crawler_run_duration_seconds",
+    "Wall time of one crawler run",
+    ["crawler", "path"],
+    buckets=DURATION_BUCKETS,
+)
+CRAWLER_RUNS = prometheus_client.Counter(
+    "producer_crawler_runs_total",
+    "Crawler runs by outcome",
+    ["crawler", "outcome"],
+)
+CRAWLER_FOUND_JOBS = prometheus_client.Counter(
+    "producer_crawler_found_jobs_total",
+    "Listings seen by a crawler",
+    ["crawler"],
+)
+CRAWLER_NEW_JOBS = prometheus_client.Counter(
+    "producer_crawler_new_jobs_total",
+    "New jobs a crawler sent to the queue",
+    ["crawler"],
+)
+CRAWLER_SCHEDULE_LAG = prometheus_client.Histogram(
+    "producer_crawler_schedule_lag_seconds",
+    "Delay between a run's planned and actual start",
+    ["crawler"],
+    buckets=WAIT_BUCKETS,
+)
+FAST_PATH_FALLBACKS = prometheus_client.Counter(
+    "producer_fast_path_fallbacks_total",
+    "Fast path runs that fell back to the browser",
+    ["crawler"],
+)
+BROWSER_LEASE_WAIT = prometheus_client.Histogram(
+    "producer_browser_lease_wait_seconds",
+    "Time a crawler waited for a pooled browser",
+    buckets=WAIT_BUCKETS,
+)
+
+
+def serve(port):
+    prometheus_client.start_http_server(port)
@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+ADAPTIVE_SPEEDUP = 0.5
+ADAPTIVE_BACKOFF = 1.25
+ADAPTIVE_JITTER = 0.1
+
+
+class CrawlerStats:
+    def __init__(self):
+        self.runs = 0
+        self.skipped = 0
+        self.last_planned = None
+        self.last_started = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.last_new = 0
+        self.total_new = 0
+
+    def as_dict(self):
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "last_lag": round(self.last_lag, 3),
+            "max_lag": round(self.max_lag, 3),
+            "last_duration": round(self.last_duration, 3),
+            "last_new": self.last_new,
+            "total_new": self.total_new,
+            "avg_duration": round(self.total_duration / self.runs, 3)
+            if self.runs
+            else 0.0,
+        }
+
+
+class AdaptiveInterval:
+    """
+    Polling interval that halves after a run that found new jobs and grows by
+    a quarter after an empty one, clamped to [min_interval, max_interval].
+    """
+
+    def __init__(self, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.current = (min_interval + max_interval) / 2
+
+    def update(self, new_jobs):
+        factor = ADAPTIVE_SPEEDUP if new_jobs else ADAPTIVE_BACKOFF
+        self.current = min(
+            self.max_interval, max(self.min_interval, self.current * factor)
+        )
+        jitter = random.uniform(1 - ADAPTIVE_JITTER, 1 + ADAPTIVE_JITTER)
+        return min(self.max_interval, max(self.min_interval, self.current * jitter))
+
+
+class Scheduler:
+    """
+    Min-heap of crawler runs keyed by their next run time. The loop sleeps
+    until the earliest entry is due and is woken early whenever a run is
+    (re)scheduled.
+    """
+
+    def __init__(self, adaptive_bounds=None):
+        self.stats = {}
+        self.adaptive_bounds = adaptive_bounds
+        self._intervals = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+
+    def schedule(self, run_at, crawler, interval_range):
+        heapq.heappush(self._heap, (run_at, next(self._seq), crawler, interval_range))
+        self._wakeup.set()
+
+    async def _next_due(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = self._heap[0][0] - time.time()
+                if timeout <= 0:
+                    run_at, _, crawler, interval_range = heapq.heappop(self._heap)
+                    return run_at, crawler, interval_range
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, handler):
+        while True:
+            run_at, crawler, interval_range = await self._next_due()
+            task = asyncio.create_task(handler(crawler, interval_range, run_at))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def record_start(self, name, planned, started, interval_range):
+        stats = self.stats.setdefault(name, CrawlerStats())
+        lag = max(0.0, started - planned)
+        stats.last_planned = planned
+        stats.last_started = started
+        stats.last_lag = lag
+        stats.max_lag = max(stats.max_lag, lag)
+        stats.skipped += int(lag // interval_range[0])
+
+    def record_end(self, name, duration, new_jobs):
+        stats = self.stats.setdefault(name, CrawlerStats())
+        stats.runs += 1
+        stats.last_duration = duration
+        stats.total_duration += duration
+        stats.last_new = new_jobs
+        stats.total_new += new_jobs
+
+    def next_delay(self, name, interval_range, new_jobs):
+        """
+        Seconds until the crawler's next run. Without adaptive bounds this is
+        a random pick from its interval range; with them (a pair of factors
+        applied to the range) it follows the source's observed new-job rate.
+        """
+        if self.adaptive_bounds is None:
+            return random.randint(*interval_range)
+        interval = self._intervals.get(name)
+        if interval is None:
+            min_factor, max_factor = self.adaptive_bounds
+            interval = AdaptiveInterval(
+                interval_range[0] * min_factor, interval_range[1] * max_factor
+            )
+            self._intervals[name] = interval
+        return interval.update(new_jobs)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The crawlers import each other as src.producer.crawlers.* from the repo root
+# and open their log files under logs/ at import time.
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+)
+os.makedirs("logs", exist_ok=True)
@@ -0,0 +1,172 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from src.producer.bench import UNTHROTTLED, StubQueueAPI
+from src.producer.crawlers import apple, http_client, ibm, microsoft, oracle, ratelimit, util
+from src.producer.crawlers.watermark import watermarks
+
+pytestmark = pytest.mark.asyncio
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CSRF_TOKEN = "test-csrf-token"
+IBM_ORIGIN = "https://careers.ibm.com"
+
+# crawler: (module, job IDs in listing order, text from the first description)
+CRAWLERS = {
+    "apple": (
+        apple,
+        ["200571234_apple", "200570987_apple", "200569876_apple"],
+        "Build the services behind iCloud.",
+    ),
+    "ibm": (
+        ibm,
+        ["21034567_ibm", "21033456_ibm", "21031234_ibm"],
+        "Work on IBM Cloud.",
+    ),
+    "microsoft": (
+        microsoft,
+        ["1780123_microsoft", "1779456_microsoft", "1778789_microsoft"],
+        "Bachelor's degree in Computer Science",
+    ),
+    "oracle": (
+        oracle,
+        ["271234_oracle", "271001_oracle", "270876_oracle"],
+        "Develop Oracle Database tooling.",
+    ),
+}
+EMPTY_SEARCH = {
+    "apple": {"searchResults": []},
+    "ibm": {"hits": {"hits": []}},
+    "microsoft": {"operationResult": {"result": {"jobs": []}}},
+    "oracle": {"items": [{"requisitionList": []}]},
+}
+
+
+def load_recorded():
+    recorded = {}
+    for name in CRAWLERS:
+        with open(os.path.join(FIXTURES, f"{name}.json"), "r") as f:
+            recorded[name] = json.load(f)
+    return recorded
+
+
+def site_app(recorded):
+    """Serves each crawler's recorded responses under /<crawler>/."""
+
+    async def apple_csrf(request):
+        return web.json_response({}, headers={"x-apple-csrf-token": CSRF_TOKEN})
+
+    async def apple_search(request):
+        if request.headers.get("x-apple-csrf-token") != CSRF_TOKEN:
+            return web.json_response({"error": "missing CSRF token"}, status=403)
+        return web.json_response(recorded["apple"]["search"])
+
+    async def ibm_search(request):
+        # Job links point back at this server, which serves the job pages
+        data = json.loads(
+            json.dumps(recorded["ibm"]["search"]).replace(
+                IBM_ORIGIN, f"{request.scheme}://{request.host}/ibm"
+            )
+        )
+        return web.json_response(data)
+
+    async def ibm_page(request):
+        page = recorded["ibm"]["pages"].get("/" + request.match_info["path"])
+        if page is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=page, content_type="text/html")
+
+    def search(name):
+        async def handler(request):
+            return web.json_response(recorded[name]["search"])
+
+        return handler
+
+    def details(name):
+        async def handler(request):
+            data = recorded[name]["details"].get(request.match_info["job_id"])
+            if data is None:
+                raise web.HTTPNotFound()
+            return web.json_response(data)
+
+        return handler
+
+    app = web.Application()
+    app.router.add_get("/apple/csrf", apple_csrf)
+    app.router.add_post("/apple/search", apple_search)
+    app.router.add_get("/apple/detail/{job_id}", details("apple"))
+    app.router.add_post("/ibm/search", ibm_search)
+    app.router.add_get("/ibm/{path:.*}", ibm_page)
+    app.router.add_get("/microsoft/search", search("microsoft"))
+    app.router.add_get("/microsoft/job/{job_id}", details("microsoft"))
+    app.router.add_get("/oracle/search", search("oracle"))
+    app.router.add_get("/oracle/details/{job_id}", details("oracle"))
+    return app
+
+
+@pytest_asyncio.fixture
+async def site(aiohttp_server, monkeypatch):
+    recorded = load_recorded()
+    queue_api = StubQueueAPI()
+    site_server = await aiohttp_server(site_app(recorded))
+    queue_server = await aiohttp_server(queue_api.app())
+    base = str(site_server.make_url("")).rstrip("/")
+
+    monkeypatch.setattr(apple, "csrf_api_url", f"{base}/apple/csrf")
+    monkeypatch.setattr(apple, "search_api_url", f"{base}/apple/search")
+    monkeypatch.setattr(apple, "detail_api_url", f"{base}/apple/detail/{{position_id}}")
+    monkeypatch.setattr(ibm, "search_api_url", f"{base}/ibm/search")
+    monkeypatch.setattr(microsoft, "search_api_url", f"{base}/microsoft/search")
+    monkeypatch.setattr(microsoft, "job_api_url", f"{base}/microsoft/job/{{job_id}}")
+    monkeypatch.setattr(oracle, "search_api_url", f"{base}/oracle/search")
+    monkeypatch.setattr(oracle, "detail_api_url", f"{base}/oracle/details/{{job_id}}")
+
+    monkeypatch.setattr(util, "API_BASE_URL", str(queue_server.make_url("")).rstrip("/"))
+    monkeypatch.setattr(util, "seen_cache", util.SeenCache())
+    monkeypatch.setattr(watermarks, "enabled", False)
+    monkeypatch.setattr(ratelimit.rate_limiter, "limits", {})
+    monkeypatch.setattr(ratelimit.rate_limiter, "default", UNTHROTTLED)
+    monkeypatch.setattr(ratelimit.rate_limiter, "_buckets", {})
+    yield SimpleNamespace(recorded=recorded, queue_api=queue_api)
+    await http_client.close_session()
+
+
+@pytest.mark.parametrize("name", CRAWLERS)
+async def test_fast_path_submits_new_jobs(site, name):
+    module, job_ids, first_description = CRAWLERS[name]
+
+    result = await module.get_job_links_fast()
+
+    assert result == util.CrawlResult(len(job_ids), len(job_ids))
+    submitted = site.queue_api.submitted
+    assert [job["id"] for job in submitted] == job_ids
+    assert first_description in submitted[0]["description"]
+    for job in submitted:
+        assert job["title"] and job["link"] and job["description"]
+        assert "discovered" in job["trace"] and "submitted" in job["trace"]
+
+
+@pytest.mark.parametrize("name", CRAWLERS)
+async def test_fast_path_skips_jobs_already_submitted(site, name):
+    module, job_ids, _ = CRAWLERS[name]
+
+    await module.get_job_links_fast()
+    result = await module.get_job_links_fast()
+
+    assert result == util.CrawlResult(len(job_ids), 0)
+    assert len(site.queue_api.submitted) == len(job_ids)
+
+
+@pytest.mark.parametrize("name", CRAWLERS)
+async def test_fast_path_raises_on_empty_listing(site, name):
+    module, _, _ = CRAWLERS[name]
+    site.recorded[name]["search"] = EMPTY_SEARCH[name]
+
+    with pytest.raises(Exception, match="no jobs"):
+        await module.get_job_links_fast()
+    assert site.queue_api.submitted == []
@@ -126,6 +126,38 @@ func main() {
 		}
 	})
 
+	r.POST("/check/batch", func(c *gin.Context) {
+		var request struct {
+			Keys []string `json:"keys" binding:"required"`
+		}
+
+		if err := c.ShouldBindJSON(&request); err != nil {
+			c.JSON(http.StatusBadRequest, gin.H{"error": err.Error()})
+			return
+		}
+
+		ctx := context.Background()
+		pipe := redisClient.Pipeline()
+		results := make([]*redis.IntCmd, len(request.Keys))
+		for i, key := range request.Keys {
+			results[i] = pipe.Exists(ctx, key)
+		}
+		if _, err := pipe.Exec(ctx); err != nil {
+			logger.Errorf("Redis error: %v", err)
+			c.JSON(http.StatusInternalServerError, gin.H{"error": "Redis error"})
+			return
+		}
+
+		uncached := make([]string, 0, len(request.Keys))
+		for i, key := range request.Keys {
+			if results[i].Val() == 0 {
+				uncached = append(uncached, key)
+			}
+		}
+
+		c.JSON(http.StatusOK, gin.H{"uncached": uncached})
+	})
+
 	r.POST("/checked", func(c *gin.Context) {
 		var request struct {
 			ID string `json:"id" binding:"required"`
@@ -148,11 +180,12 @@ func main() {
 	})
 	r.POST("/submit", func(c *gin.Context) {
 		var request struct {
-			ID          string `json:"id" binding:"required"`
-			Company     string `json:"company" binding:"required"`
-			Description string `json:"description" binding:"required"`
-			Link        string `json:"link" binding:"required"`
-			Title       string `json:"title" binding:"required"`
+			ID          string             `json:"id" binding:"required"`
+			Company     string             `json:"company" binding:"required"`
+			Description string             `json:"description" binding:"required"`
+			Link        string             `json:"link" binding:"required"`
+			Title       string             `json:"title" binding:"required"`
+			Trace       map[string]float64 `json:"trace,omitempty"`
 		}
 
 		if err := c.ShouldBindJSON(&request); err != nil {
@@ -160,6 +193,12 @@ func main() {
 			return
 		}
 
+		// Freshness trace: stamp when the job was handed to the queue
+		if request.Trace == nil {
+			request.Trace = map[string]float64{}
+		}
+		request.Trace["queued"] = float64(time.Now().UnixNano()) / 1e9
+
 		message, err := json.Marshal(request)
 		if err != nil {
 			logger.Errorf("JSON marshal error: %v", err)